@@ -1,11 +1,47 @@
-from flask import Flask, render_template, request
 import os
+import uuid
+from contextlib import nullcontext
+
+from flask import Flask, Response, jsonify, render_template, request, url_for
 from extractor import run_extraction
+from jobs import DONE, FAILED, JobQueue, QueueFull
 from model1 import interpret_parameters
+from stage_metrics import PrometheusRecorder, add_hook, profile, stage
 
 app = Flask(__name__)
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# background extraction: worker threads and the most uploads allowed to wait
+JOB_WORKERS = 2
+JOB_QUEUE_SIZE = 16
+# seconds a client is told to wait before retrying when the queue is full
+RETRY_AFTER = 30
+
+JOBS = JobQueue(workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE)
+
+# stage latencies, page sources and cache hits, served at /metrics
+METRICS = PrometheusRecorder()
+add_hook(METRICS)
+
+# per-request profiles for deep dives: None (off), "cprofile" or
+# "pyinstrument"; when set, a request with ?profile=1 writes one to PROFILE_DIR
+PROFILER = None
+PROFILE_DIR = "outputs/profiles"
+
+
+def profile_path():
+    """Where to write this request's profile, or None if it was not asked for"""
+    if not PROFILER or request.args.get("profile") != "1":
+        return None
+    ext = ".html" if PROFILER == "pyinstrument" else ".prof"
+    return os.path.join(PROFILE_DIR, uuid.uuid4().hex + ext)
+
+
+def analyze(data: bytes, filename: str, patient_id: str, profile_to: str = None) -> dict:
+    # uploads are extracted from memory; only a PDF with scanned pages is
+    # written once, to a temporary file, for the page renderer
+    with profile(profile_to, PROFILER) if profile_to else nullcontext(), stage("request"):
+        extracted = run_extraction(data, patient_id, filename=filename)
+        return {"extracted": extracted, "analysis": interpret_parameters(extracted)}
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -19,16 +55,85 @@ def home():
         file = request.files["file"]
 
         if file:
-            path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(path)
-
-            extracted = run_extraction(path, "WEB001")
-            analysis = interpret_parameters(extracted)
+            profile_to = profile_path()
+            with profile(profile_to, PROFILER) if profile_to else nullcontext(), stage("request"):
+                extracted = run_extraction(file.stream, "WEB001", filename=file.filename)
+                analysis = interpret_parameters(extracted)
 
     return render_template("index.html",
                            extracted=extracted,
                            analysis=analysis)
 
 
+# =========================================================
+# ASYNC API
+# =========================================================
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+
+    file = request.files.get("file")
+    if not file or not file.filename:
+        return jsonify({"error": "no file uploaded"}), 400
+
+    profile_to = profile_path()
+
+    try:
+        job = JOBS.submit(analyze, file.read(), file.filename, request.form.get("patient_id", "WEB001"), profile_to)
+    except QueueFull:
+        response = jsonify({"error": "extraction queue is full, retry later"})
+        response.headers["Retry-After"] = str(RETRY_AFTER)
+        return response, 503
+
+    response = jsonify(job.to_dict())
+    response.headers["Location"] = url_for("job_status", job_id=job.id)
+    if profile_to:
+        response.headers["X-Profile"] = profile_to
+    return response, 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown or expired job"}), 404
+
+    info = job.to_dict()
+    if job.status == DONE:
+        info["result_url"] = url_for("job_result", job_id=job.id)
+    return jsonify(info)
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown or expired job"}), 404
+
+    if job.status == FAILED:
+        return jsonify(job.to_dict()), 500
+    if job.status != DONE:
+        # not ready yet: same body as the status route
+        return jsonify(job.to_dict()), 202
+
+    return jsonify(job.result)
+
+
+# =========================================================
+# METRICS
+# =========================================================
+@app.route("/metrics", methods=["GET"])
+def metrics():
+
+    body = METRICS.render()
+    body += (
+        "# HELP extractor_jobs_queued Uploads waiting for an extraction worker\n"
+        "# TYPE extractor_jobs_queued gauge\n"
+        f"extractor_jobs_queued {JOBS.depth()}\n"
+    )
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,218 @@
+"""
+Batch extraction over a directory tree or a list of report files.
+
+Every finished file is appended to a JSON-lines manifest (done, failed or
+timed_out), so an interrupted run started again with the same manifest
+picks up where it stopped. Throughput is printed as files complete.
+
+    python batch_extract.py reports/ --workers 4 --timeout 600
+    python batch_extract.py @file_list.txt --manifest outputs/backfill.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from extractor import IMAGE_EXTENSIONS, run_extraction
+
+SUPPORTED_EXTENSIONS = IMAGE_EXTENSIONS | {".pdf", ".txt"}
+
+DEFAULT_MANIFEST = "outputs/batch_manifest.jsonl"
+
+# seconds between checks for finished or overdue files
+POLL_INTERVAL = 0.5
+
+
+# =========================================================
+# INPUT DISCOVERY
+# =========================================================
+def collect_files(inputs) -> list:
+
+    files = []
+
+    for item in inputs:
+
+        # @list.txt -> one path per line
+        if item.startswith("@"):
+            with open(item[1:], "r", encoding="utf-8") as f:
+                files.extend(line.strip() for line in f if line.strip())
+
+        elif os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                        files.append(os.path.join(root, name))
+
+        else:
+            files.append(item)
+
+    # stable order, no duplicates
+    return list(dict.fromkeys(os.path.abspath(f) for f in files))
+
+
+# =========================================================
+# MANIFEST
+# =========================================================
+def load_manifest(path: str) -> dict:
+
+    status = {}
+
+    if not os.path.exists(path):
+        return status
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # a run killed mid-write can leave a partial last line
+                continue
+            status[record["file"]] = record["status"]
+
+    return status
+
+
+def append_manifest(path: str, record: dict):
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# =========================================================
+# WORKER
+# =========================================================
+def process_file(file_path: str, early_exit: bool) -> dict:
+
+    start = time.perf_counter()
+    stats = {}
+
+    try:
+        patient_id = os.path.splitext(os.path.basename(file_path))[0]
+        run_extraction(file_path, patient_id, early_exit=early_exit, stats=stats)
+        status, error = "done", None
+    except Exception as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+
+    return {
+        "file": file_path,
+        "status": status,
+        "pages": stats.get("pages_read", 0),
+        "seconds": round(time.perf_counter() - start, 3),
+        "error": error,
+    }
+
+
+# =========================================================
+# DRIVER
+# =========================================================
+class Progress:
+
+    def __init__(self, total: int):
+        self.total = total
+        self.counts = {"done": 0, "failed": 0, "timed_out": 0}
+        self.pages = 0
+        self.start = time.perf_counter()
+
+    def update(self, record: dict):
+        self.counts[record["status"]] += 1
+        self.pages += record.get("pages", 0)
+
+        finished = sum(self.counts.values())
+        minutes = max(time.perf_counter() - self.start, 1e-9) / 60
+
+        print(
+            f"[{finished}/{self.total}] {record['status']:<9} {os.path.basename(record['file'])}"
+            f" | {finished / minutes:.1f} files/min, {self.pages / minutes:.1f} pages/min",
+            flush=True
+        )
+
+
+def run_batch(files, manifest: str, workers: int, timeout: float, early_exit: bool) -> dict:
+
+    progress = Progress(len(files))
+    queue = list(reversed(files))
+
+    def finish(record):
+        record["finished"] = datetime.now(timezone.utc).isoformat()
+        append_manifest(manifest, record)
+        progress.update(record)
+
+    while queue:
+        pool = multiprocessing.Pool(workers)
+        running = {}
+        restart = False
+
+        try:
+            while (queue or running) and not restart:
+
+                # keep at most one file per worker in flight, so the
+                # submit time is close to the start time for the timeout
+                while queue and len(running) < workers:
+                    path = queue.pop()
+                    running[path] = (pool.apply_async(process_file, (path, early_exit)), time.monotonic())
+
+                time.sleep(POLL_INTERVAL)
+
+                for path, (result, started) in list(running.items()):
+                    if result.ready():
+                        del running[path]
+                        finish(result.get())
+
+                    elif timeout and time.monotonic() - started > timeout:
+                        del running[path]
+                        finish({
+                            "file": path, "status": "timed_out", "pages": 0,
+                            "seconds": round(time.monotonic() - started, 3),
+                            "error": f"exceeded {timeout}s",
+                        })
+                        restart = True
+
+        finally:
+            # a hung worker can only be stopped by replacing the pool;
+            # files that were still running go back on the queue
+            pool.terminate()
+            pool.join()
+
+        queue.extend(reversed(list(running)))
+
+    return progress.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="directories, files, or @file_list.txt")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=900, help="seconds per file (0 = no limit)")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--retry-failed", action="store_true", help="also redo failed and timed-out files")
+    parser.add_argument("--early-exit", action="store_true", help="stop reading a file once every analyte in ranges.py is found")
+    args = parser.parse_args()
+
+    files = collect_files(args.inputs)
+    previous = load_manifest(args.manifest)
+
+    skip = {"done"} if args.retry_failed else {"done", "failed", "timed_out"}
+    todo = [f for f in files if previous.get(f) not in skip]
+
+    print(f"{len(files)} file(s), {len(files) - len(todo)} already in manifest, {len(todo)} to process")
+
+    if not todo:
+        return
+
+    counts = run_batch(todo, args.manifest, max(args.workers, 1), args.timeout, args.early_exit)
+
+    print(f"done: {counts['done']}, failed: {counts['failed']}, timed out: {counts['timed_out']}")
+
+    if counts["failed"] or counts["timed_out"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
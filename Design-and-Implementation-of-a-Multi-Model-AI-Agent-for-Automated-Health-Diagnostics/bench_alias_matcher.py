@@ -0,0 +1,128 @@
+"""
+Benchmark: compiled alias matcher vs the old per-line / per-alias loop.
+
+extract_parameters converts values to standard units, so the old loop
+applies the same standard_value to the number and unit it picked; the
+report mixes units so that a matcher picking another line shows up.
+
+    python bench_alias_matcher.py [--pages 30] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+
+from extractor import (
+    KNOWN_PARAMETERS,
+    PARAMETER_ALIASES,
+    extract_parameters,
+    normalize_text,
+    standard_value,
+)
+
+
+# =========================================================
+# REFERENCE IMPLEMENTATION (PREVIOUS LOOP)
+# =========================================================
+def legacy_extract_parameters(text: str) -> dict:
+
+    extracted = {p: None for p in KNOWN_PARAMETERS}
+
+    for line in text.splitlines():
+        for param, aliases in PARAMETER_ALIASES.items():
+
+            if extracted[param] is not None:
+                continue
+
+            if any(re.search(rf"\b{alias}\b", line) for alias in aliases):
+
+                numbers = list(re.finditer(r"\d+\.\d+|\d+", line))
+
+                if numbers:
+                    decimal_nums = [n for n in numbers if "." in n.group()]
+                    number = decimal_nums[0] if decimal_nums else numbers[0]
+                    unit = re.match(r"[ \t]*(\S*)", line[number.end():]).group(1)
+                    extracted[param] = standard_value(param, float(number.group()), unit)
+
+    name = re.search(r"patient name\s*[:\-]\s*([a-z ]+?)(?:\n|age)", text, re.I)
+    if name:
+        extracted["patient_name"] = name.group(1).strip()
+
+    age = re.search(r"age\s*[:\-]\s*(\d+)", text, re.I)
+    if age:
+        extracted["age"] = float(age.group(1))
+
+    gender = re.search(r"\b(male|female)\b", text, re.I)
+    if gender:
+        extracted["gender"] = gender.group(1).lower()
+
+    return extracted
+
+
+# =========================================================
+# SYNTHETIC REPORT
+# =========================================================
+FILLER = [
+    "method: spectrophotometry, sample collected at 08:30",
+    "this report is electronically verified and does not need a signature",
+    "reference interval may vary with age, sex and laboratory method",
+    "page {page} of {pages}",
+    "dr. a. kumar md pathology reg no 12345",
+]
+
+# standard, converted, unconvertible and missing units
+UNITS = ["mg/dl", "g/dl", "mmol/l", "cells/cumm", "lakhs/cumm", "iu/ml", ""]
+
+
+def synthetic_report(pages: int, lines_per_page: int = 60, seed: int = 7) -> str:
+
+    rng = random.Random(seed)
+
+    # a real report only carries a few panels, so most parameters are never
+    # found and the old loop keeps retrying their aliases on every line
+    panel = rng.sample(sorted(PARAMETER_ALIASES), k=len(PARAMETER_ALIASES) // 3)
+    aliases = [a for param in panel for a in PARAMETER_ALIASES[param]]
+    out = ["patient name : john doe", "age : 45 years sex : male"]
+
+    for page in range(1, pages + 1):
+        for _ in range(lines_per_page):
+            if rng.random() < 0.05:
+                alias = rng.choice(aliases)
+                out.append(f"{alias} {rng.uniform(0.1, 300):.1f} {rng.choice(UNITS)} 10 - 100")
+            else:
+                out.append(rng.choice(FILLER).format(page=page, pages=pages))
+
+    return normalize_text("\n".join(out))
+
+
+def timed(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = synthetic_report(args.pages)
+
+    legacy_time, legacy = timed(legacy_extract_parameters, text, args.repeat)
+    compiled_time, compiled = timed(extract_parameters, text, args.repeat)
+
+    if legacy != compiled:
+        raise SystemExit(f"results differ:\n{legacy}\n{compiled}")
+
+    print(f"pages            : {args.pages} ({len(text.splitlines())} lines)")
+    print(f"legacy loop      : {legacy_time * 1000:.2f} ms")
+    print(f"compiled matcher : {compiled_time * 1000:.2f} ms")
+    print(f"speedup          : {legacy_time / compiled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
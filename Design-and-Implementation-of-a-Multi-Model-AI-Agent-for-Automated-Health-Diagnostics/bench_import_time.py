@@ -0,0 +1,70 @@
+"""
+Import-time budget for the parsing-only extractor API.
+
+Imports extractor in fresh interpreters under `python -X importtime`,
+takes the best cumulative time of a few runs and fails if it is over the
+budget. It also fails if a backend was loaded by the import or by
+extracting a .txt report (one with a unit to convert), since those must
+only load for PDFs, images and whole-table conversion.
+
+    python bench_import_time.py [--budget-ms 200] [--runs 5]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# modules only PDF / image extraction (or whole-table unit conversion) may load
+BACKENDS = ["cv2", "numpy", "pandas", "pdf2image", "pdfplumber", "pytesseract", "PIL"]
+
+CHILD = """
+import os, sys, tempfile
+from extractor import extract_parameters, extract_text, normalize_text
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "report.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Hemoglobin 13.2 g/dL\\nWBC Count 7500 cells/cumm\\n")
+    extract_parameters(extract_text(path, use_cache=False))
+print(",".join(m for m in {backends!r} if m in sys.modules))
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+extractor\s*$", re.M)
+
+
+def measure() -> tuple:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(backends=BACKENDS)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    cumulative_us = int(IMPORT_LINE.search(out.stderr).group(1))
+    loaded = [m for m in out.stdout.strip().split(",") if m]
+    return cumulative_us / 1000, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [measure() for _ in range(args.runs)]
+    best = min(ms for ms, _ in results)
+    loaded = sorted({m for _, modules in results for m in modules})
+
+    print(f"import extractor: best {best:.1f} ms of {args.runs} run(s), budget {args.budget_ms:.0f} ms")
+    print(f"backends loaded : {', '.join(loaded) or 'none'}")
+
+    failures = []
+    if best > args.budget_ms:
+        failures.append(f"import took {best:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"parsing-only use loaded {', '.join(loaded)}")
+
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Peak-memory check for extract_text on a synthetic 100-page scanned PDF.
+
+A manual check, not part of an automated suite: run it after changing
+page streaming or OCR. Builds an image-only PDF, extracts it in a fresh
+child process and fails (exit status 1) if the child's peak RSS goes over
+the budget. Every page is rendered, but by default the OCR step is a
+no-op, so the check covers rendering and page buffering only; pass --ocr
+to run real Tesseract as well. Needs Poppler (pdf2image) and reports SKIP
+without it.
+
+    python bench_page_memory.py [--pages 100] [--window 4] [--limit-mb 600] [--ocr]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from PIL import Image, ImageDraw
+
+
+def build_scanned_pdf(path: str, pages: int, dpi: int = 300):
+
+    # one A4 page image reused for every page keeps the generator itself small
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+
+    for row in range(40):
+        draw.text((150, 200 + row * 70), f"hemoglobin {12 + row % 5}.{row % 10} g/dl 13.0 - 17.0", fill="black")
+
+    img.save(path, save_all=True, append_images=[img] * (pages - 1), resolution=dpi)
+
+
+def child(pdf_path: str, window: int, ocr: bool):
+
+    import resource
+    import extractor
+
+    if not ocr:
+        # still render every page, just skip Tesseract
+        def render_only(pages, *args, **kwargs):
+            dpi = max(kwargs.get("dpi_steps", extractor.OCR_DPI_STEPS))
+            for page in pages:
+                if callable(page):
+                    page(dpi)
+            return ["" for _ in pages]
+
+        extractor.ocr_images = render_only
+
+    text = extractor.extract_text(pdf_path, use_cache=False, page_window=window)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    print(f"{peak_mb:.1f} {len(text)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--window", type=int, default=4)
+    parser.add_argument("--limit-mb", type=float, default=600)
+    parser.add_argument("--ocr", action="store_true")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.window, args.ocr)
+        return
+
+    # pdf2image shells out to Poppler's pdftoppm
+    if shutil.which("pdftoppm") is None:
+        print("SKIP: Poppler (pdftoppm) not found; install it to run this check")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "scan.pdf")
+        build_scanned_pdf(pdf_path, args.pages)
+
+        cmd = [sys.executable, __file__, "--child", pdf_path, "--window", str(args.window)]
+        if args.ocr:
+            cmd.append("--ocr")
+
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        peak_mb = float(out.stdout.split()[0])
+
+    print(f"pages    : {args.pages}")
+    print(f"window   : {args.window}")
+    print(f"OCR      : {'tesseract' if args.ocr else 'skipped (pages rendered only)'}")
+    print(f"peak RSS : {peak_mb:.1f} MB (budget {args.limit_mb:.0f} MB)")
+
+    if peak_mb > args.limit_mb:
+        raise SystemExit("FAIL: peak RSS over budget")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: table-first extraction vs the text-layer regex on digital PDFs.
+
+Writes a synthetic report whose results sit in a ruled two-panel table
+(test / result / unit / range, twice side by side), then extracts it with
+TABLE_EXTRACTION off and on and reports accuracy and time per page.
+Needs PyMuPDF to draw the PDF.
+
+    python bench_table_extraction.py [--pages 20] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import fitz
+
+import extractor
+
+# name, value and unit as printed, expected value in the extractor's units
+RESULTS = [
+    ("hemoglobin", "Hemoglobin", "11.2", "g/dL", 11.2),
+    ("wbc_count", "Total Leukocyte Count", "7,500", "cells/cumm", 7.5),
+    ("platelet_count", "Platelet Count", "2.1", "lakhs/cumm", 210.0),
+    ("fasting_plasma_glucose", "Fasting Plasma Glucose", "96", "mg/dL", 96.0),
+    ("creatinine", "Creatinine", "1.1", "mg/dL", 1.1),
+    ("total_cholesterol", "Total Cholesterol", "212", "mg/dL", 212.0),
+    ("hdl_cholesterol", "HDL Cholesterol", "38", "mg/dL", 38.0),
+    ("ldl_cholesterol", "LDL Cholesterol", "141", "mg/dL", 141.0),
+    ("triglycerides", "Triglycerides", "180", "mg/dL", 180.0),
+    ("tsh", "TSH", "2.4", "uIU/mL", 2.4),
+]
+
+WIDTHS = [110, 45, 60, 60] * 2
+ROW_HEIGHT = 18
+
+
+def draw_table(page, x0, y0, rows):
+    xs = [x0]
+    for width in WIDTHS:
+        xs.append(xs[-1] + width)
+
+    for r, row in enumerate(rows):
+        for c, cell in enumerate(row):
+            page.insert_text((xs[c] + 3, y0 + r * ROW_HEIGHT + 13), cell, fontsize=8)
+
+    for r in range(len(rows) + 1):
+        page.draw_line((xs[0], y0 + r * ROW_HEIGHT), (xs[-1], y0 + r * ROW_HEIGHT))
+    for x in xs:
+        page.draw_line((x, y0), (x, y0 + len(rows) * ROW_HEIGHT))
+
+
+def write_report(path, pages):
+    half = len(RESULTS) // 2
+    rows = [["Test", "Result", "Unit", "Ref. Range"] * 2]
+    for left, right in zip(RESULTS[:half], RESULTS[half:]):
+        rows.append([left[1], left[2], left[3], "-", right[1], right[2], right[3], "-"])
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=700)
+        page.insert_text((40, 40), f"Patient Name: Test Patient\nAge: 45   Sex: Male   Page {i + 1}", fontsize=10)
+        # results on the last page; earlier pages carry other panels
+        if i == pages - 1:
+            draw_table(page, 30, 80, rows)
+    doc.save(path)
+
+
+def extract(path, tables):
+    # run_extraction's steps, without the page cache or the result store
+    pages = list(extractor.iter_pages(path, use_cache=False, tables=tables))
+    if tables:
+        return extractor.extract_parameters_incremental(pages, extractor.KNOWN_PARAMETERS)
+    return extractor.extract_parameters(extractor.normalize_text("\n".join(text for text, _ in pages)))
+
+
+def run(path, tables, repeat):
+    extract(path, tables)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        params = extract(path, tables)
+    elapsed = (time.perf_counter() - start) / repeat
+    correct = sum(
+        params[param] is not None and abs(params[param] - expected) < 1e-6
+        for param, _, _, _, expected in RESULTS
+    )
+    return elapsed, correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.pdf")
+        write_report(path, args.pages)
+
+        for label, tables in (("text regex", False), ("table-first", True)):
+            elapsed, correct = run(path, tables, args.repeat)
+            print(f"{label:12}: {correct}/{len(RESULTS)} values correct, "
+                  f"{elapsed / args.pages * 1000:.1f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
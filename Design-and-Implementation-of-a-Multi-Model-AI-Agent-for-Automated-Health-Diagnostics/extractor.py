@@ -1,20 +1,109 @@
-from importlib.resources import path
-import numbers
 import os
 import re
+import sys
 import csv
-import pdfplumber
-import pytesseract
-import cv2
-import numpy as np
-from pdf2image import convert_from_path
-from PIL import Image
-from PIL import ImageEnhance, ImageFilter
+import io
+import json
+import logging
+import tempfile
+from bisect import bisect_right
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, partial
+from typing import NamedTuple
+
+# shared helpers live in the top-level src/ package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.page_cache import PageTextCache, file_digest
+from src.units import UnitConverter
+from result_store import ResultStore
+from stage_metrics import count, stage
+
+# Format backends (pdfplumber, pdf2image, PIL, pytesseract) and the numpy /
+# pandas based unit converter are imported inside the functions that need
+# them, so the parsing API and .txt inputs start without them
+# (bench_import_time.py keeps this within budget).
+
+logger = logging.getLogger(__name__)
 
 # =========================================================
 # TESSERACT PATH (CHANGE IF NEEDED)
 # =========================================================
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+
+@lru_cache(maxsize=None)
+def ocr_backend():
+    """src.ocr, imported on first use with pytesseract pointed at TESSERACT_CMD"""
+    import pytesseract
+    from src import ocr
+
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return ocr
+
+
+def ocr_images(*args, **kwargs):
+    return ocr_backend().ocr_images(*args, **kwargs)
+
+
+def ocr_pool(*args, **kwargs):
+    return ocr_backend().ocr_pool(*args, **kwargs)
+
+
+def tesseract_version():
+    return ocr_backend().tesseract_version()
+
+
+# =========================================================
+# OCR SETTINGS
+# =========================================================
+# worker processes for page OCR (1 = serial, same as before)
+OCR_WORKERS = 1
+
+# OCR backend (see src/ocr_engines.py); "tesseract-batch" runs one
+# tesseract process per batch of pages instead of one per page
+OCR_ENGINE = "pytesseract"
+
+# seconds before a single page's Tesseract run is abandoned
+OCR_PAGE_TIMEOUT = 120
+
+# rasterization resolutions, lowest first: a page is re-rendered at the
+# next DPI only while Tesseract's mean word confidence stays below the bar
+OCR_DPI_STEPS = (200, 300)
+OCR_MIN_CONFIDENCE = 80
+
+# OCR only the result-table regions of each page (full page as fallback);
+# off by default because patient details usually sit outside the tables
+OCR_ROI = False
+
+# a page whose text layer has no more characters than this is OCR'd
+TEXT_LAYER_MIN_CHARS = 20
+
+# read the result tables of digital PDF pages (pdfplumber extract_tables)
+# and take values from their test / result / unit columns; pages without
+# a usable table fall back to the line regex
+TABLE_EXTRACTION = True
+
+# pages rendered and held in memory at once
+OCR_PAGE_WINDOW = 4
+
+
+# =========================================================
+# PAGE TEXT CACHE
+# =========================================================
+# raw per-page text keyed by file hash, so re-uploads skip OCR
+PAGE_CACHE = PageTextCache("cache/page_text.sqlite3", max_bytes=256 * 1024 * 1024)
+
+
+def extraction_settings() -> dict:
+    # anything that changes page text must be part of the cache key
+    return {
+        "backend": "pdfplumber+pdf2image",
+        "dpi_steps": OCR_DPI_STEPS,
+        "min_confidence": OCR_MIN_CONFIDENCE,
+        "roi": OCR_ROI,
+        "text_layer_min_chars": TEXT_LAYER_MIN_CHARS,
+        "ocr": f"{OCR_ENGINE} / tesseract {tesseract_version()}",
+    }
 
 
 # =========================================================
@@ -78,67 +167,327 @@ PARAMETER_ALIASES = {
 }
 
 
+# =========================================================
+# COMPILED ALIAS MATCHER (BUILT ONCE AT IMPORT)
+# =========================================================
+NUMBER_PATTERN = re.compile(r"\d+\.\d+|\d+")
+
+
+def build_alias_matcher(aliases_by_param: dict):
+    """
+    Compile every alias into a single alternation regex.
+
+    The alternation sits inside a lookahead, so the scan stops at every word
+    boundary and aliases that overlap each other are all seen. Longer aliases
+    are tried first; when one wins at a position, any shorter alias that is a
+    whole-word prefix of it matched there too, so its parameters are mapped
+    to the longer alias as well.
+    """
+    pairs = [
+        (alias, param)
+        for param, aliases in aliases_by_param.items()
+        for alias in aliases
+    ]
+    pairs.sort(key=lambda pair: len(pair[0]), reverse=True)
+
+    alias_params = {}
+
+    for alias, _ in pairs:
+        params = [
+            param for other, param in pairs
+            if re.match(rf"{other}\b", alias)
+        ]
+        alias_params[alias] = tuple(dict.fromkeys(params))
+
+    # cheap first-character gate before trying the alternation
+    first_chars = "".join(sorted({re.escape(alias[0]) for alias, _ in pairs}))
+    alternation = "|".join(alias for alias in alias_params)
+
+    pattern = re.compile(rf"\b(?=[{first_chars}])(?=({alternation})\b)")
+
+    return pattern, alias_params
+
+
+ALIAS_PATTERN, ALIAS_PARAMS = build_alias_matcher(PARAMETER_ALIASES)
+
+
 # =========================================================
 # TEXT EXTRACTION FROM FILE
 # =========================================================
-def extract_text(path: str) -> str:
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tiff", ".bmp"}
+
+
+def extract_text(path, ocr_workers: int = None, use_cache: bool = True,
+                 page_window: int = None, stats: dict = None, filename: str = None) -> str:
+
+    return normalize_text("\n".join(
+        iter_page_texts(path, ocr_workers, use_cache, page_window, stats, filename)
+    ))
+
+
+def open_source(source, filename: str = None):
+    """
+    Path -> (path, extension). Bytes or a file-like object -> (bytes,
+    extension), with the extension taken from filename; the buffer is
+    then read in memory and never written to the uploads folder.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        return path, os.path.splitext(filename or path)[1].lower()
+
+    if hasattr(source, "read"):
+        source = source.read()
+
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Expected a path, bytes or a file-like object, got {type(source).__name__}")
 
-    if not os.path.isfile(path):
-        raise FileNotFoundError(f"File not found: {path}")
+    if not filename:
+        raise ValueError("filename is required to tell the format of in-memory input")
 
-    ext = os.path.splitext(path)[1].lower()
-    text_out = []
+    return bytes(source), os.path.splitext(filename)[1].lower()
+
+
+def iter_page_texts(path, ocr_workers: int = None, use_cache: bool = True,
+                    page_window: int = None, stats: dict = None, filename: str = None):
+    """
+    Yield the raw text of each page, in order, as soon as it is ready.
+
+    path may also be bytes or a file-like object, with filename giving its
+    format. Pages are rendered and OCR'd page_window at a time and released
+    before the next window, so peak memory does not grow with document
+    length. If a stats dict is given, "pages_total" is set once the page
+    count is known and "ocr_failed_pages" lists the pages whose OCR timed
+    out; a document with such pages is not cached.
+    """
+
+    pages = iter_pages(path, ocr_workers, use_cache, page_window, stats, filename, tables=False)
+    try:
+        for text, _ in pages:
+            yield text
+    finally:
+        pages.close()
+
+
+def iter_pages(path, ocr_workers: int = None, use_cache: bool = True, page_window: int = None,
+               stats: dict = None, filename: str = None, tables: bool = None):
+    """
+    Like iter_page_texts, but yield (text, table rows) for each page.
+
+    With tables (default: TABLE_EXTRACTION), the result tables of each
+    digital PDF page are read in the same pass as its text; scanned pages,
+    images and text files have no rows.
+    """
+
+    if stats is None:
+        stats = {}
+
+    if ocr_workers is None:
+        ocr_workers = OCR_WORKERS
+
+    if page_window is None:
+        page_window = OCR_PAGE_WINDOW
+
+    if tables is None:
+        tables = TABLE_EXTRACTION
+
+    path, ext = open_source(path, filename)
+
+    if ext not in IMAGE_EXTENSIONS | {".pdf", ".txt"}:
+        raise ValueError("Supported formats: PDF, PNG, JPG, JPEG, TIFF, BMP, TXT")
+
+    tables = tables and ext == ".pdf"
+
+    # plain text is cheaper to re-read than to look up
+    if ext == ".txt" or not use_cache:
+        yield from stream_pages(path, ext, ocr_workers, page_window, stats, tables)
+        return
+
+    digest = file_digest(path)
+    settings = extraction_settings()
+    if tables:
+        settings["tables"] = TABLE_FORMAT
+
+    with stage("cache_lookup"):
+        cached = PAGE_CACHE.get_pages(digest, settings)
+
+    count("cache_requests", cache="page_text", result="miss" if cached is None else "hit")
+
+    if cached is not None:
+        stats["pages_total"] = len(cached)
+        stats["ocr_failed_pages"] = []
+        count("pages", len(cached), source="cached")
+        for entry in cached:
+            yield decode_page(entry) if tables else (entry, [])
+        return
+
+    # only a fully read document is cached; an early exit stores nothing
+    pages = []
+    for text, rows in stream_pages(path, ext, ocr_workers, page_window, stats, tables):
+        pages.append(encode_page(text, rows) if tables else text)
+        yield text, rows
+
+    # a page whose OCR timed out is read again next time, not cached as blank
+    if stats["ocr_failed_pages"]:
+        logger.warning(f"Not caching {digest[:12]}: OCR failed on page(s) {stats['ocr_failed_pages']}")
+        return
+
+    with stage("cache_store"):
+        PAGE_CACHE.put_pages(digest, settings, pages)
+
+
+def has_text_layer(text) -> bool:
+    return bool(text) and len(text.strip()) > TEXT_LAYER_MIN_CHARS
+
+
+@contextmanager
+def render_source(source):
+    """
+    Yield a function giving the file OCR renders read the PDF from. A path
+    is used as is; in-memory bytes are written once, to a temporary file,
+    the first time a scanned page needs them, and removed on exit. Poppler
+    reads files either way, and handing it bytes would write the whole PDF
+    again for every page and DPI step (and pickle it into every pool task).
+    """
+
+    spooled = []
+
+    def path():
+        if not isinstance(source, bytes):
+            return source
+        if not spooled:
+            fd, name = tempfile.mkstemp(suffix=".pdf")
+            spooled.append(name)
+            with os.fdopen(fd, "wb") as f:
+                f.write(source)
+        return spooled[0]
+
+    try:
+        yield path
+    finally:
+        for name in spooled:
+            try:
+                os.remove(name)
+            except OSError as e:
+                logger.warning(f"Could not remove spooled PDF {name}: {e}")
+
+
+def render_pdf_page(path, page_number: int, dpi: int):
+    # module-level so it can be pickled into OCR pool workers; path is a
+    # file, spooled by render_source for in-memory input
+    from pdf2image import convert_from_path
+
+    # timed only when rendering in this process (serial OCR)
+    with stage("rasterize"):
+        return convert_from_path(path, dpi=dpi, first_page=page_number, last_page=page_number)[0]
+
+
+def stream_pages(path, ext: str, ocr_workers: int, page_window: int, stats: dict, tables: bool = False):
+
+    # in-memory input: hand the libraries a buffer instead of a path
+    in_memory = isinstance(path, bytes)
+
+    # 1-based numbers of pages whose OCR timed out (their text is empty)
+    stats["ocr_failed_pages"] = []
 
     # ---------------- IMAGE ----------------
-    if ext in {".png", ".jpg", ".jpeg", ".tiff", ".bmp"}:
-        img = Image.open(path)
-        text_out.append(pytesseract.image_to_string(img))
+    if ext in IMAGE_EXTENSIONS:
+        from PIL import Image
+
+        stats["pages_total"] = 1
+        count("pages", source="ocr")
+        img = Image.open(io.BytesIO(path) if in_memory else path)
+        failed = []
+        with stage("ocr"):
+            texts = ocr_images([img], page_timeout=OCR_PAGE_TIMEOUT, roi=OCR_ROI, engine=OCR_ENGINE,
+                               failed=failed)
+        stats["ocr_failed_pages"] += [i + 1 for i in failed]
+        for text in texts:
+            yield text, []
 
     # ---------------- PDF ------------------
     elif ext == ".pdf":
+        import pdfplumber
+
+        with stage("pdf_open"):
+            pdf = pdfplumber.open(io.BytesIO(path) if in_memory else path)
+
+        # removed last, after the pool that renders from it has shut down
+        with render_source(path) as render_path, pdf, ocr_pool(ocr_workers) as pool:
 
-        with pdfplumber.open(path) as pdf:
+            page_count = len(pdf.pages)
+            stats["pages_total"] = page_count
 
-            is_text_pdf = False
+            for start in range(0, page_count, page_window):
+                stop = min(start + page_window, page_count)
 
-            # detect text PDF
-            for page in pdf.pages[:2]:
-                t = page.extract_text()
-                if t and len(t.strip()) > 20:
-                    is_text_pdf = True
-                    break
+                text_out = []
+                rows_out = []
+                ocr_pages = []
+                renders = []
 
-            # TEXT PDF
-            if is_text_pdf:
-                for page in pdf.pages:
-                    t = page.extract_text()
-                    if t:
+                # each page is classified by its own text layer, so a
+                # digital cover page does not decide for scanned results
+                for i in range(start, stop):
+                    page = pdf.pages[i]
+                    with stage("text_layer"):
+                        t = page.extract_text()
+
+                    if has_text_layer(t):
+                        count("pages", source="text_layer")
                         text_out.append(t)
+                        # tables reuse the characters extract_text just parsed;
+                        # pages without ruling lines cannot hold a ruled table
+                        rows = []
+                        if tables and (page.lines or page.rects):
+                            with stage("tables"):
+                                rows = table_rows(page.extract_tables())
+                        rows_out.append(rows)
                     else:
-                        img = page.to_image(resolution=300).original
-                        text_out.append(pytesseract.image_to_string(img))
-
-            # SCANNED PDF
-            else:
-                images = convert_from_path(path, dpi=300)
-                for img in images:
-                    text_out.append(pytesseract.image_to_string(img))
+                        count("pages", source="ocr")
+                        text_out.append("")
+                        rows_out.append([])
+                        ocr_pages.append(i - start)
+                        renders.append(partial(render_pdf_page, render_path(), i + 1))
+
+                    # drop pdfplumber's cached layout objects for this page
+                    page.close()
+
+                # pages are rendered inside the OCR step, one at a time
+                failed = []
+                with stage("ocr") if renders else nullcontext():
+                    texts = ocr_images(
+                        renders, ocr_workers, OCR_PAGE_TIMEOUT, pool=pool,
+                        dpi_steps=OCR_DPI_STEPS, min_confidence=OCR_MIN_CONFIDENCE,
+                        roi=OCR_ROI, engine=OCR_ENGINE, failed=failed
+                    )
+                for i, t in zip(ocr_pages, texts):
+                    text_out[i] = t
+                stats["ocr_failed_pages"] += [start + ocr_pages[i] + 1 for i in failed]
+
+                yield from zip(text_out, rows_out)
 
     # ---------------- TEXT FILE ----------------
     elif ext == ".txt":
-        with open(path, "r", encoding="utf-8") as f:
-            text_out.append(f.read())
-
-    else:
-        raise ValueError("Supported formats: PDF, PNG, JPG, JPEG, TIFF, BMP, TXT")
-
-    return normalize_text("\n".join(text_out))
+        stats["pages_total"] = 1
+        count("pages", source="text")
+        if in_memory:
+            yield path.decode("utf-8"), []
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                yield f.read(), []
 
 
 # =========================================================
 # TEXT CLEANING
 # =========================================================
 def normalize_text(text: str) -> str:
+    with stage("normalize"):
+        return _normalize_text(text)
+
+
+def _normalize_text(text: str) -> str:
     text = text.lower()
 
     text = text.translate(str.maketrans({
@@ -160,34 +509,81 @@ def normalize_text(text: str) -> str:
 # =========================================================
 # PARAMETER EXTRACTION
 # =========================================================
+# the token right after a value, taken as its unit ("7500 cells/cumm")
+UNIT_TOKEN = re.compile(r"[ \t]*(\S*)")
+
+
+def line_value(line: str):
+    """(value, unit) of a result line, or None if it holds no number"""
+
+    numbers = list(NUMBER_PATTERN.finditer(line))
+
+    if not numbers:
+        return None
+
+    # choose first decimal if exists (most lab values are decimals)
+    match = next((m for m in numbers if "." in m.group()), numbers[0])
+
+    return float(match.group()), UNIT_TOKEN.match(line, match.end()).group(1)
+
+
+def standard_value(param: str, value: float, unit: str) -> float:
+    """
+    value in the parameter's standard unit (e.g. WBC in cells/cumm to
+    x10^3/uL); unchanged when the unit has no conversion. A missing unit
+    is the standard one, except for raw counts such as "Platelets 250000".
+    """
+
+    return UnitConverter.convert(value, param, unit)[0]
+
+
 def extract_parameters(text: str) -> dict:
 
     extracted = {p: None for p in KNOWN_PARAMETERS}
 
-    lines = text.splitlines()
-
+    # line boundaries must match str.splitlines() exactly
+    lines = text.splitlines(keepends=True)
+    line_starts = []
+    offset = 0
     for line in lines:
-        for param, aliases in PARAMETER_ALIASES.items():
+        line_starts.append(offset)
+        offset += len(line)
 
-            if extracted[param] is not None:
-                continue
+    line_values = {}
+    remaining = set(PARAMETER_ALIASES)
 
-            if any(re.search(rf"\b{alias}\b", line) for alias in aliases):
+    # one scan over the whole text; hits arrive in text order, so the
+    # first line that carries a number wins for each parameter
+    for match in ALIAS_PATTERN.finditer(text):
 
-                numbers = re.findall(r"\d+\.\d+|\d+", line)
+        if not remaining:
+            break
 
-                if numbers:
-                    # choose first decimal if exists (most lab values are decimals)
-                    decimal_nums = [n for n in numbers if "." in n]
+        params = [p for p in ALIAS_PARAMS[match.group(1)] if p in remaining]
+        if not params:
+            continue
 
-                    if decimal_nums:
-                        value = decimal_nums[0]
-                    else:
-                        value = numbers[0]
+        line_no = bisect_right(line_starts, match.start()) - 1
+
+        if line_no not in line_values:
+            line_values[line_no] = line_value(lines[line_no])
+
+        found = line_values[line_no]
+        if found is None:
+            continue
+
+        for param in params:
+            extracted[param] = standard_value(param, *found)
+            remaining.discard(param)
+
+    return extract_patient_info(text, extracted)
+
+
+def extract_patient_info(text: str, extracted: dict) -> dict:
 
-                    extracted[param] = float(value)
     # ---------- PATIENT INFO ----------
-    name = re.search(r"patient name\s*[:\-]\s*([a-z ]+?)(?:\n|age)", text, re.I)
+    # a name may end the text, e.g. when it is the last line of a page
+    name = re.search(r"patient name\s*[:\-]\s*([a-z ]+?)(?:\n|age|$)", text, re.I)
     if name:
         extracted["patient_name"] = name.group(1).strip()
 
@@ -202,9 +598,219 @@ def extract_parameters(text: str) -> dict:
     return extracted
 
 
+# =========================================================
+# TABLE EXTRACTION (DIGITAL PDF PAGES)
+# =========================================================
+# bump when TableRow or the header mapping changes, so cached rows are re-read
+TABLE_FORMAT = "extract_tables/1"
+
+
+class TableRow(NamedTuple):
+    name: str
+    value: float
+    unit: str
+    reference: str
+
+
+# header words for each column role, tried in this order: "Normal Value"
+# is a reference column and "Test Result" a result column
+HEADER_ROLES = (
+    ("reference", {"reference", "ref", "range", "interval", "normal", "limits"}),
+    ("unit", {"unit", "units", "uom"}),
+    ("result", {"result", "results", "value", "observed", "observation"}),
+    ("test", {"test", "tests", "investigation", "parameter", "description", "examination", "analyte", "name"}),
+)
+
+
+def cell_text(cell) -> str:
+    return " ".join(str(cell).split()) if cell else ""
+
+
+def header_groups(row) -> list:
+    """
+    Column roles of a header row as a list of {role: column} groups, one per
+    side-by-side block of result columns; [] if row is not a header.
+    """
+
+    groups, current = [], {}
+
+    for col, cell in enumerate(row):
+        words = set(re.findall(r"[a-z]+", cell_text(cell).lower()))
+        role = next((role for role, keys in HEADER_ROLES if words & keys), None)
+
+        if role is None:
+            continue
+
+        # a second test column starts the next block of a multi-column layout
+        if role in current:
+            groups.append(current)
+            current = {}
+
+        current[role] = col
+
+    groups.append(current)
+
+    return [g for g in groups if "test" in g and "result" in g]
+
+
+def cell_value(cell):
+    match = NUMBER_PATTERN.search(re.sub(r"(?<=\d),(?=\d{3})", "", cell_text(cell)))
+    return float(match.group()) if match else None
+
+
+def table_rows(tables) -> list:
+    """
+    Result rows of one page's tables, as returned by pdfplumber's
+    extract_tables(). Columns are found from each table's header row; rows
+    before a header, and rows without a test name or a numeric result, are
+    skipped.
+    """
+
+    rows = []
+
+    for table in tables:
+        groups = []
+
+        for row in table:
+            found = header_groups(row)
+            if found:
+                # headers may repeat, e.g. once per panel
+                groups = found
+                continue
+
+            for group in groups:
+                cells = {role: row[col] if col < len(row) else None for role, col in group.items()}
+
+                name = cell_text(cells["test"])
+                value = cell_value(cells["result"])
+
+                if name and value is not None:
+                    rows.append(TableRow(
+                        name, value, cell_text(cells.get("unit")), cell_text(cells.get("reference"))
+                    ))
+
+    return rows
+
+
+def table_parameters(rows) -> dict:
+    """
+    {parameter: value} for table rows whose test name holds a known alias;
+    the first row wins. Values are brought to the standard unit, as in
+    extract_parameters.
+    """
+
+    found = {}
+
+    for row in rows:
+        match = ALIAS_PATTERN.search(_normalize_text(row.name))
+        if not match:
+            continue
+
+        for param in ALIAS_PARAMS[match.group(1)]:
+            if param not in found:
+                found[param] = standard_value(param, row.value, row.unit)
+
+    return found
+
+
+def encode_page(text: str, rows) -> str:
+    return json.dumps({"text": text, "rows": [list(row) for row in rows]})
+
+
+def decode_page(entry: str):
+    page = json.loads(entry)
+    return page["text"], [TableRow(*row) for row in page["rows"]]
+
+
+def extract_page_parameters(text: str, rows=()) -> dict:
+    """
+    Parameters of one raw page: the line regex over its text, overridden by
+    the page's result tables for the parameters those name (a table cell
+    cannot pick up a neighbouring column's number). Values outside the
+    tables and patient details come from the text.
+    """
+
+    text = normalize_text(text)
+
+    with stage("match"):
+        extracted = extract_parameters(text)
+        extracted.update(table_parameters(rows))
+
+        return extracted
+
+
+# =========================================================
+# INCREMENTAL EXTRACTION (STOP ONCE COMPLETE)
+# =========================================================
+def extract_parameters_incremental(pages, required=None, stats: dict = None) -> dict:
+    """
+    Extract parameters page by page and stop reading once every parameter
+    in required has a value. The default is the analytes the app interprets
+    (ranges.ANALYTES); patient details and other analytes are kept when
+    found on the pages read, but do not hold reading back. Pass
+    KNOWN_PARAMETERS to read until everything is found.
+
+    pages is an iterable of raw page texts or (text, table rows) pairs,
+    normally iter_pages(); when it is a generator it is closed on exit, so
+    no further pages are rendered or OCR'd. Earlier pages win, so when every
+    page is read and none has table rows the result equals extract_parameters
+    on the joined text; within a page, table values win over the line regex
+    (see extract_page_parameters).
+    """
+
+    if required is None:
+        # imported here: ranges loads the reference range registry
+        from ranges import ANALYTES as required
+
+    required = set(required)
+
+    unknown = required - KNOWN_PARAMETERS
+    if unknown:
+        raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+
+    extracted = {p: None for p in KNOWN_PARAMETERS}
+    pages_read = 0
+
+    try:
+        for page in pages:
+            pages_read += 1
+
+            text, rows = (page, ()) if isinstance(page, str) else page
+            found = extract_page_parameters(text, rows)
+            for param, value in found.items():
+                if extracted[param] is None:
+                    extracted[param] = value
+
+            if all(extracted[p] is not None for p in required):
+                break
+    finally:
+        if hasattr(pages, "close"):
+            pages.close()
+
+    if stats is not None:
+        stats["pages_read"] = pages_read
+
+    return extracted
+
 
 # =========================================================
-# CSV STORAGE
+# RESULT STORAGE
+# =========================================================
+# indexed SQLite store (WAL) shared safely by web workers and batch jobs
+RESULT_STORE = ResultStore("outputs/results.sqlite3")
+
+
+def save_result(patient_id: str, parameters: dict, report_date=None, source: str = None) -> int:
+    with stage("store"):
+        return RESULT_STORE.save(patient_id, parameters, report_date, source)
+
+
+def export_csv(file_path: str = "outputs/parameters.csv") -> int:
+    return RESULT_STORE.export_csv(file_path, sorted(KNOWN_PARAMETERS))
+
+
+# =========================================================
+# CSV STORAGE (LEGACY APPEND-ONLY FORMAT)
 # =========================================================
 def save_to_csv(patient_id: str, parameters: dict):
 
@@ -213,7 +819,7 @@ def save_to_csv(patient_id: str, parameters: dict):
 
     file_exists = os.path.exists(file_path)
 
-    with open(file_path, "a", newline="", encoding="utf-8") as f:
+    with stage("csv_write"), open(file_path, "a", newline="", encoding="utf-8") as f:
 
         writer = csv.DictWriter(
             f,
@@ -232,12 +838,46 @@ def save_to_csv(patient_id: str, parameters: dict):
 # =========================================================
 # MASTER FUNCTION (CALL THIS FROM MAIN PIPELINE)
 # =========================================================
-def run_extraction(file_path: str, patient_id: str):
+def run_extraction(file_path, patient_id: str, early_exit: bool = False,
+                   required=None, stats: dict = None, report_date=None, filename: str = None):
+    """
+    file_path may be a path, bytes or a file-like object (e.g. a Flask
+    upload stream); for the latter two, filename gives the format.
+    """
 
-    text = extract_text(file_path)
+    if stats is None:
+        stats = {}
 
-    params = extract_parameters(text)
+    # read a stream once, up front, so the source can be named below
+    file_path, _ = open_source(file_path, filename)
+    source = filename or (os.path.basename(file_path) if isinstance(file_path, str) else None)
+
+    if early_exit:
+        pages = iter_pages(file_path, stats=stats, filename=filename)
+        params = extract_parameters_incremental(pages, required, stats)
+
+    else:
+        pages = list(iter_pages(file_path, stats=stats, filename=filename))
+
+        if any(rows for _, rows in pages):
+            # per page, so each page's table values override its own lines
+            params = extract_parameters_incremental(pages, KNOWN_PARAMETERS)
+        else:
+            text = normalize_text("\n".join(text for text, _ in pages))
+            with stage("match"):
+                params = extract_parameters(text)
+
+        stats["pages_read"] = stats.get("pages_total", 0)
+
+    stats["pages_skipped"] = stats.get("pages_total", 0) - stats["pages_read"]
+
+    if stats["pages_skipped"]:
+        logger.info(
+            f"{source}: read {stats['pages_read']} of {stats['pages_total']} "
+            f"page(s), skipped {stats['pages_skipped']}"
+        )
 
-    save_to_csv(patient_id, params)
+    save_result(patient_id, params, report_date, source=source)
+    count("documents")
 
     return params
@@ -0,0 +1,126 @@
+"""
+In-process job queue for long-running extractions.
+
+A fixed pool of daemon worker threads pulls jobs from a bounded queue; no
+external broker is needed. submit() raises QueueFull instead of blocking
+when the queue is at capacity, so the web layer can answer 503 right away.
+Finished jobs are kept for RESULT_TTL seconds so clients can poll for them.
+"""
+import logging
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+logger = logging.getLogger(__name__)
+
+QueueFull = queue.Full
+
+# seconds a finished job stays available for polling
+RESULT_TTL = 3600
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+
+    def __init__(self, func, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        info = {
+            "job_id": self.id,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if self.status == FAILED:
+            info["error"] = self.error
+        return info
+
+
+class JobQueue:
+
+    def __init__(self, workers: int = 2, max_queued: int = 16, result_ttl: float = RESULT_TTL):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    # -----------------------------------------------------
+    # CLIENT SIDE
+    # -----------------------------------------------------
+    def submit(self, func, *args, **kwargs) -> Job:
+        """Queue func(*args, **kwargs); raises QueueFull when at capacity"""
+        self.start()
+        self._expire()
+
+        job = Job(func, args, kwargs)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        try:
+            self._queue.put_nowait(job)
+        except QueueFull:
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+                del self._jobs[job_id]
+
+    # -----------------------------------------------------
+    # WORKER SIDE
+    # -----------------------------------------------------
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            job.status, job.started = RUNNING, time.time()
+
+            try:
+                job.result = job.func(*job.args, **job.kwargs)
+                job.status = DONE
+            except Exception as e:
+                logger.error(f"Job {job.id} failed:\n{traceback.format_exc()}")
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = FAILED
+            finally:
+                # drop the inputs; the upload may be large
+                job.args = job.kwargs = None
+                job.finished = time.time()
+                self._queue.task_done()
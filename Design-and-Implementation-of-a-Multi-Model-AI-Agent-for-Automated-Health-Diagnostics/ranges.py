@@ -1,18 +1,55 @@
-REFERENCE_RANGES = {
-    "hemoglobin": (12,16),
-    "wbc_count": (4000,11000),
-    "platelet_count": (150000,450000),
+import os
+import sys
+from collections.abc import Mapping
 
-    "fasting_plasma_glucose": (70,100),
-    "hba1c": (4.0,5.6),
+# reference ranges live in the shared registry (src/reference_ranges.json)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.reference_ranges import get_registry
 
-    "total_cholesterol": (125,200),
-    "hdl_cholesterol": (40,60),
-    "ldl_cholesterol": (0,130),
-    "triglycerides": (0,150),
+ANALYTES = [
+    "hemoglobin",
+    "wbc_count",
+    "platelet_count",
 
-    "creatinine": (0.6,1.3),
-    "urea": (7,20),
+    "fasting_plasma_glucose",
+    "hba1c",
 
-    "tsh": (0.4,4.0)
-}
+    "total_cholesterol",
+    "hdl_cholesterol",
+    "ldl_cholesterol",
+    "triglycerides",
+
+    "creatinine",
+    "urea",
+
+    "tsh"
+]
+
+
+_cached = (None, {})
+
+
+def reference_ranges() -> dict:
+    # rebuilt only when the registry has reloaded the JSON file
+    global _cached
+    registry = get_registry()
+    version = registry.version
+    if _cached[0] != version:
+        _cached = (version, registry.min_max(ANALYTES))
+    return _cached[1]
+
+
+class LiveRanges(Mapping):
+    """{analyte: (min, max)} read from the registry on each access, so an edit to the JSON file shows up"""
+
+    def __getitem__(self, analyte):
+        return reference_ranges()[analyte]
+
+    def __iter__(self):
+        return iter(reference_ranges())
+
+    def __len__(self):
+        return len(reference_ranges())
+
+
+REFERENCE_RANGES = LiveRanges()
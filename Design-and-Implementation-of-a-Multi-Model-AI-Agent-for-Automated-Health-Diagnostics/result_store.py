@@ -0,0 +1,300 @@
+"""
+Indexed, concurrency-safe storage for extracted report parameters.
+
+SQLite in WAL mode: readers never block the writer, and concurrent writers
+(Flask workers, batch processes) are serialized by SQLite's own locking
+instead of interleaving rows in a shared CSV file.
+
+    python result_store.py import outputs/parameters.csv [--date 2024-01-31]
+    python result_store.py export outputs/parameters_export.csv
+"""
+import argparse
+import csv
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+# stored on the report row; every other parameter is a numeric analyte
+DEMOGRAPHIC_FIELDS = ("patient_name", "age", "gender")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    source TEXT,
+    patient_name TEXT,
+    age REAL,
+    gender TEXT,
+    created_at TEXT NOT NULL,
+    import_key TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    analyte TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (report_id, analyte)
+);
+CREATE INDEX IF NOT EXISTS reports_patient_date ON reports (patient_id, report_date);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (report_date);
+CREATE INDEX IF NOT EXISTS results_analyte ON results (analyte, report_id);
+"""
+
+
+def _iso_date(value) -> str:
+    """YYYY-MM-DD for a date, datetime or ISO 8601 string (default: today); ValueError otherwise"""
+    if value is None:
+        return date.today().isoformat()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    text = str(value).strip()
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid report date {value!r}, expected YYYY-MM-DD") from None
+
+
+def _import_key(source: str, row_number: int, row: dict) -> str:
+    # a CSV row is the same report however often it is imported; the digest
+    # tells apart rows of different files that share a name
+    digest = hashlib.sha256("\x1f".join(f"{k}={v}" for k, v in row.items()).encode("utf-8")).hexdigest()
+    return f"{source}:{row_number}:{digest[:16]}"
+
+
+class ResultStore:
+
+    def __init__(self, path: str = "outputs/results.sqlite3", timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                # stores created before CSV imports were keyed
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+                if "import_key" not in columns:
+                    conn.execute("ALTER TABLE reports ADD COLUMN import_key TEXT")
+                # NULL keys (extraction runs) never collide
+                conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS reports_import_key ON reports (import_key)")
+                self._ready = True
+            yield conn
+        finally:
+            conn.close()
+
+    # -----------------------------------------------------
+    # WRITES
+    # -----------------------------------------------------
+    def save(self, patient_id: str, parameters: dict, report_date=None, source: str = None) -> int:
+        return self.save_many([(patient_id, parameters, report_date, source)])[0]
+
+    def save_many(self, reports, import_keys=None) -> list:
+        """
+        Store (patient_id, parameters, report_date, source) tuples in one
+        transaction; either all reports are written or none are.
+
+        import_keys, parallel to reports, marks imported rows: a report whose
+        key is already stored is skipped, and only new reports' ids are
+        returned.
+        """
+        created_at = datetime.now(timezone.utc).isoformat()
+        report_ids = []
+        reports = list(reports)
+        if import_keys is None:
+            import_keys = [None] * len(reports)
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for (patient_id, parameters, report_date, source), key in zip(reports, import_keys):
+                    cur = conn.execute(
+                        "INSERT OR IGNORE INTO reports"
+                        " (patient_id, report_date, source, patient_name, age, gender, created_at, import_key)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            patient_id, _iso_date(report_date), source,
+                            parameters.get("patient_name"), parameters.get("age"),
+                            parameters.get("gender"), created_at, key,
+                        )
+                    )
+                    if not cur.rowcount:
+                        continue
+                    report_ids.append(cur.lastrowid)
+
+                    conn.executemany(
+                        "INSERT INTO results (report_id, analyte, value) VALUES (?, ?, ?)",
+                        [
+                            (cur.lastrowid, analyte, float(value))
+                            for analyte, value in parameters.items()
+                            if analyte not in DEMOGRAPHIC_FIELDS and value is not None
+                        ]
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return report_ids
+
+    # -----------------------------------------------------
+    # READS
+    # -----------------------------------------------------
+    def _reports(self, conn, where: str, args: tuple) -> list:
+
+        reports = {}
+        for row in conn.execute(
+            f"SELECT * FROM reports WHERE {where} ORDER BY report_date, id", args
+        ):
+            reports[row["id"]] = {
+                "report_id": row["id"],
+                "patient_id": row["patient_id"],
+                "report_date": row["report_date"],
+                "source": row["source"],
+                "parameters": {f: row[f] for f in DEMOGRAPHIC_FIELDS},
+            }
+
+        if reports:
+            ids = list(reports)
+            # chunk to stay under SQLite's bound-parameter limit
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for row in conn.execute(
+                    f"SELECT report_id, analyte, value FROM results"
+                    f" WHERE report_id IN ({','.join('?' * len(chunk))})", chunk
+                ):
+                    reports[row["report_id"]]["parameters"][row["analyte"]] = row["value"]
+
+        return list(reports.values())
+
+    def by_patient(self, patient_id: str) -> list:
+        with self._connect() as conn:
+            return self._reports(conn, "patient_id = ?", (patient_id,))
+
+    def by_date_range(self, start=None, end=None) -> list:
+        """Reports with start <= report_date <= end (either bound optional)"""
+        with self._connect() as conn:
+            return self._reports(
+                conn, "report_date >= ? AND report_date <= ?",
+                (_iso_date(start) if start else "", _iso_date(end) if end else "9999-12-31")
+            )
+
+    def by_analyte(self, analyte: str, start=None, end=None) -> list:
+        """(patient_id, report_date, value) rows for one analyte, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT r.patient_id, r.report_date, v.value FROM results v"
+                " JOIN reports r ON r.id = v.report_id"
+                " WHERE v.analyte = ? AND r.report_date >= ? AND r.report_date <= ?"
+                " ORDER BY r.report_date, r.id",
+                (analyte, _iso_date(start) if start else "", _iso_date(end) if end else "9999-12-31")
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    # -----------------------------------------------------
+    # CSV IMPORT / EXPORT
+    # -----------------------------------------------------
+    def import_csv(self, csv_path: str, report_date=None, batch_size: int = 1000) -> int:
+        """
+        Load a parameters.csv written by extractor.save_to_csv (or export_csv).
+        Rows without a report_date column get report_date (default: today).
+
+        Each row is keyed by file name, row number and content, so importing
+        the same file again skips the rows already stored (and picks up rows
+        appended since). Returns the number of reports added. An invalid date
+        raises ValueError naming the row; rows before it stay imported.
+        """
+        source = os.path.basename(csv_path)
+        count = 0
+        batch = []
+        keys = []
+
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                key = _import_key(source, reader.line_num, row)
+                patient_id = row.pop("patient_id")
+                row_date = row.pop("report_date", None) or report_date
+                try:
+                    row_date = _iso_date(row_date)
+                except ValueError as e:
+                    raise ValueError(f"{csv_path}, line {reader.line_num}: {e}") from None
+
+                parameters = {}
+                for name, value in row.items():
+                    if value in ("", None):
+                        continue
+                    parameters[name] = value if name in ("patient_name", "gender") else float(value)
+
+                batch.append((patient_id, parameters, row_date, source))
+                keys.append(key)
+
+                if len(batch) >= batch_size:
+                    count += len(self.save_many(batch, keys))
+                    batch, keys = [], []
+
+        if batch:
+            count += len(self.save_many(batch, keys))
+
+        return count
+
+    def export_csv(self, csv_path: str, fieldnames=None) -> int:
+        """Write every report as one CSV row: the save_to_csv layout plus report_date"""
+        reports = self.by_date_range()
+
+        if fieldnames is None:
+            analytes = {k for r in reports for k in r["parameters"]} - set(DEMOGRAPHIC_FIELDS)
+            fieldnames = sorted(analytes | set(DEMOGRAPHIC_FIELDS))
+
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["patient_id", "report_date"] + list(fieldnames),
+                                    extrasaction="ignore")
+            writer.writeheader()
+            for report in reports:
+                row = {"patient_id": report["patient_id"], "report_date": report["report_date"]}
+                row.update(report["parameters"])
+                writer.writerow(row)
+
+        return len(reports)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="outputs/results.sqlite3")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="import an existing parameters.csv (rows already imported are skipped)")
+    imp.add_argument("csv_path")
+    imp.add_argument("--date", help="report date for the imported rows (YYYY-MM-DD, default today)")
+
+    exp = sub.add_parser("export", help="write all stored reports to CSV")
+    exp.add_argument("csv_path")
+
+    args = parser.parse_args()
+    store = ResultStore(args.db)
+
+    if args.command == "import":
+        print(f"imported {store.import_csv(args.csv_path, args.date)} report(s) into {args.db}")
+    else:
+        print(f"exported {store.export_csv(args.csv_path)} report(s) to {args.csv_path}")
+
+
+if __name__ == "__main__":
+    main()
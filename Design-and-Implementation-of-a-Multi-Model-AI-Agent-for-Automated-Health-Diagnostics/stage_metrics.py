@@ -0,0 +1,212 @@
+"""
+Stage timing hooks for the extractor, and a Prometheus text exposition.
+
+The extractor wraps each stage (PDF open, text layer, OCR, normalization,
+parameter matching, storage) in stage(name) and reports page sources and
+cache lookups through count(name, **labels). Nothing is measured until a
+hook is registered with add_hook(); with no hooks, stage() hands back one
+shared no-op context manager and count() returns at once, so the batch CLI
+and other callers pay next to nothing.
+
+PrometheusRecorder is the hook the Flask app registers: latency histograms
+per stage, counters, and the derived OCR page and cache hit ratios, served
+at /metrics. profile() dumps a cProfile or pyinstrument profile of one
+block for deep dives.
+"""
+import contextlib
+import cProfile
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_hooks = []
+_hooks_lock = threading.Lock()
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+def add_hook(hook):
+    """Register an object with observe(stage, seconds) and count(name, value, labels)"""
+    with _hooks_lock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+
+
+def remove_hook(hook):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+class _Timer:
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        for hook in list(_hooks):
+            hook.observe(self.name, elapsed)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing one stage; a shared no-op when no hook is registered"""
+    if not _hooks:
+        return _NO_STAGE
+    return _Timer(name)
+
+
+def count(name: str, value: float = 1, **labels):
+    """Add value to counter name (e.g. count("pages", source="ocr"))"""
+    if not _hooks:
+        return
+    for hook in list(_hooks):
+        hook.count(name, value, labels)
+
+
+# =========================================================
+# PROMETHEUS RECORDER
+# =========================================================
+HELP = {
+    "stage_seconds": "Time spent in each extraction stage",
+    "documents": "Documents extracted",
+    "pages": "Pages read, by where their text came from (text_layer, ocr, text, cached)",
+    "cache_requests": "Page text cache lookups, by result (hit, miss)",
+}
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class PrometheusRecorder:
+    """Thread-safe histograms and counters, rendered in the Prometheus text format"""
+
+    def __init__(self, namespace: str = "extractor", buckets=BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._histograms = {}   # stage -> [bucket counts..., +Inf count, sum]
+        self._counters = {}     # (name, label pairs) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            counts = self._histograms.get(stage)
+            if counts is None:
+                counts = self._histograms[stage] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, seconds)] += 1
+            counts[-1] += seconds
+
+    def count(self, name: str, value: float, labels: dict):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def render(self) -> str:
+        ns = self.namespace
+        with self._lock:
+            histograms = {stage: list(counts) for stage, counts in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = [
+            f"# HELP {ns}_stage_seconds {HELP['stage_seconds']}",
+            f"# TYPE {ns}_stage_seconds histogram",
+        ]
+        for stage in sorted(histograms):
+            counts = histograms[stage]
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts[:-1]):
+                cumulative += n
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {counts[-1]:.6f}')
+            lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# HELP {ns}_{name}_total {HELP.get(name, name)}")
+            lines.append(f"# TYPE {ns}_{name}_total counter")
+            for (counter, pairs), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{ns}_{name}_total{_labels(pairs)} {value:g}")
+
+        # ratios for dashboards; Prometheus can derive them from the counters too
+        pages = {dict(pairs).get("source"): v for (name, pairs), v in counters.items() if name == "pages"}
+        read = pages.get("ocr", 0) + pages.get("text_layer", 0)
+        if read:
+            lines.append(f"# HELP {ns}_ocr_page_ratio Share of PDF and image pages that needed OCR")
+            lines.append(f"# TYPE {ns}_ocr_page_ratio gauge")
+            lines.append(f"{ns}_ocr_page_ratio {pages.get('ocr', 0) / read:.6f}")
+
+        lookups = {}
+        for (name, pairs), value in counters.items():
+            if name == "cache_requests":
+                labels = dict(pairs)
+                hits, total = lookups.get(labels.get("cache"), (0, 0))
+                lookups[labels.get("cache")] = (hits + value * (labels.get("result") == "hit"), total + value)
+        if lookups:
+            lines.append(f"# HELP {ns}_cache_hit_ratio Share of cache lookups that hit")
+            lines.append(f"# TYPE {ns}_cache_hit_ratio gauge")
+            for cache, (hits, total) in sorted(lookups.items()):
+                lines.append(f'{ns}_cache_hit_ratio{{cache="{cache}"}} {hits / total:.6f}')
+
+        return "\n".join(lines) + "\n"
+
+
+# =========================================================
+# PROFILING
+# =========================================================
+@contextlib.contextmanager
+def profile(path: str, backend: str = "cprofile"):
+    """
+    Profile the enclosed block and write it to path: a .prof file for
+    cprofile (open with snakeviz / pstats), an .html page for pyinstrument.
+    If the profiler cannot start (another one is active in this process),
+    the block runs unprofiled.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if backend == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        start, stop = profiler.start, profiler.stop
+    else:
+        profiler = cProfile.Profile()
+        start, stop = profiler.enable, profiler.disable
+
+    try:
+        start()
+    except (RuntimeError, ValueError) as e:
+        logger.warning(f"Profiling skipped: {e}")
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        stop()
+        if backend == "pyinstrument":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.dump_stats(path)
+        logger.info(f"Wrote {backend} profile to {path}")
@@ -4,69 +4,132 @@ import pytesseract
 from PIL import Image
 import io
 import pandas as pd
-import re
+from src.ocr import ocr_images, tesseract_version
+from src.page_cache import PageTextCache, file_digest
+from src.classifier import BORDERLINE, HIGH, LOW, NORMAL, format_status
+from src.reference_ranges import get_registry
+from src.token_index import DocumentIndex
 
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Worker processes for OCR of image-only pages (1 = serial) and per-page time limit
+OCR_WORKERS = 1
+OCR_PAGE_TIMEOUT = 120
+OCR_DPI = 300
+# OCR backend from src/ocr_engines.py ("tesseract-batch" = one tesseract run for all pages)
+OCR_ENGINE = "pytesseract"
+
+# Raw per-page text keyed by upload hash, so re-uploads skip OCR entirely
+# no spinner: called at import, before st.set_page_config
+@st.cache_resource(show_spinner=False)
+def page_cache():
+    return PageTextCache("cache/page_text.sqlite3", max_bytes=256 * 1024 * 1024)
+
+PAGE_CACHE = page_cache()
+
+# Per-upload text and results kept in memory by upload hash, so reruns
+# triggered by widgets after an analysis redo nothing
+RESULT_CACHE_TTL = 3600
+RESULT_CACHE_ENTRIES = 32
+
 st.set_page_config(page_title="AI Health Diagnostic Agent", layout="wide")
 st.title("AI Health Diagnostic Agent")
 
 uploaded_file = st.file_uploader("Upload Blood Report (PDF)", type=["pdf"])
 
-def extract_content(file_bytes):
+class IncompleteText(Exception):
+    """Text of an upload with pages that failed OCR; carries the partial text, which is not cached"""
+
+    def __init__(self, text, pages):
+        super().__init__(f"OCR timed out on page(s) {', '.join(map(str, pages))}")
+        self.text = text
+
+def extract_content(file_bytes, ocr_workers=OCR_WORKERS, digest=None):
+    digest = digest or file_digest(file_bytes)
+    settings = {"backend": "fitz", "dpi": OCR_DPI, "ocr": f"{OCR_ENGINE} / tesseract {tesseract_version()}"}
+    cached = PAGE_CACHE.get_pages(digest, settings)
+    if cached is not None:
+        return "".join(cached)
+
     doc = fitz.open(stream=file_bytes, filetype="pdf")
-    full_text = ""
-    for page in doc:
+    texts, ocr_pages, ocr_imgs = [], [], []
+    for i, page in enumerate(doc):
         text = page.get_text()
-        if text.strip(): full_text += text
-        else:
-            pix = page.get_pixmap(dpi=300)
-            img = Image.open(io.BytesIO(pix.tobytes())).convert('L')
-            full_text += pytesseract.image_to_string(img)
-    return full_text
+        texts.append(text)
+        if not text.strip():
+            pix = page.get_pixmap(dpi=OCR_DPI)
+            ocr_pages.append(i)
+            ocr_imgs.append(Image.open(io.BytesIO(pix.tobytes())).convert('L'))
+    failed = []
+    for i, text in zip(ocr_pages, ocr_images(ocr_imgs, ocr_workers, OCR_PAGE_TIMEOUT, engine=OCR_ENGINE, failed=failed)):
+        texts[i] = text
+    # pages whose OCR timed out are retried on the next upload, never cached
+    if failed:
+        raise IncompleteText("".join(texts), [ocr_pages[i] + 1 for i in failed])
+    PAGE_CACHE.put_pages(digest, settings, texts)
+    return "".join(texts)
 
+# Thresholds come from the shared registry (src/reference_ranges.json)
 TESTS = {
-    "Hemoglobin": {"aliases": ["Hemoglobin", "Hb"], "low": 13.0, "high": 17.0, "unit": "g/dL"},
-    "Glucose": {"aliases": ["Glucose", "FBS", "Sugar"], "normal": 100, "medium": 125, "unit": "mg/dL"},
-    "Cholesterol": {"aliases": ["Cholesterol", "Total Cholesterol"], "normal": 200, "medium": 239, "unit": "mg/dL"},
-    "Creatinine": {"aliases": ["Creatinine", "CREA"], "low": 0.7, "high": 1.3, "unit": "mg/dL"},
-    "Platelets": {"aliases": ["Platelets", "PLT", "Platelet Count"], "low": 150, "high": 450, "unit": "10^3/µL"},
-    "WBC Count": {"aliases": ["Total Leucocyte Count", "WBC", "TLC"], "low": 4.0, "high": 11.0, "unit": "10^3/µL"}
+    "Hemoglobin": {"aliases": ["Hemoglobin", "Hb"], "unit": "g/dL"},
+    "Glucose": {"aliases": ["Glucose", "FBS", "Sugar"], "unit": "mg/dL"},
+    "Cholesterol": {"aliases": ["Cholesterol", "Total Cholesterol"], "unit": "mg/dL"},
+    "Creatinine": {"aliases": ["Creatinine", "CREA"], "unit": "mg/dL"},
+    "Platelets": {"aliases": ["Platelets", "PLT", "Platelet Count"], "unit": "10^3/µL"},
+    "WBC Count": {"aliases": ["Total Leucocyte Count", "WBC", "TLC"], "unit": "10^3/µL"}
 }
 
+STATUS_LABELS = {LOW: "Low", NORMAL: "Normal", BORDERLINE: "Medium (Borderline)", HIGH: "High"}
+
+def interpret_values(test_names, values):
+    ranges = get_registry().table
+    codes = ranges.classify(test_names, values)
+    labels = format_status(codes, STATUS_LABELS)
+    # tests graded normal/medium call their top band critical
+    labels[(codes == HIGH) & ranges.has_borderline(test_names)] = "High (Critical)"
+    return labels
+
 def interpret_value(test_name, val):
-    ref = TESTS[test_name]
-    if "medium" in ref:
-        if val <= ref["normal"]: return "Normal"
-        elif val <= ref["medium"]: return "Medium (Borderline)"
-        else: return "High (Critical)"
-    else:
-        if val < ref["low"]: return "Low"
-        if val > ref["high"]: return "High"
-        return "Normal"
+    return interpret_values([test_name], [val])[0]
+
+def extract_results(raw_text):
+    # one tokenizer pass; each test takes the nearest number after its first
+    # mention that has one (same line or just below)
+    index = DocumentIndex(raw_text, {name: info["aliases"] for name, info in TESTS.items()})
+    results = []
+    for test_name, info in TESTS.items():
+        val = index.value(test_name)
+        if val is not None:
+            if test_name == "WBC Count" and val > 100: val = val / 1000
+            results.append({
+                "Parameter": test_name, 
+                "Value": val, 
+                "Unit": info["unit"]
+            })
+    return results
+
+# _file_bytes is left out of the cache key; the SHA-256 digest identifies the upload
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_ENTRIES, show_spinner=False)
+def report_text(digest, _file_bytes):
+    return extract_content(_file_bytes, digest=digest)
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_ENTRIES, show_spinner=False)
+def report_results(digest, _file_bytes):
+    return extract_results(report_text(digest, _file_bytes))
 
 if uploaded_file:
     with st.spinner("Analyzing..."):
-        raw_text = extract_content(uploaded_file.read())
-        results = []
-        for test_name, info in TESTS.items():
-            for alias in info["aliases"]:
-                pattern = rf"{alias}.*?(\d+\.?\d*)"
-                match = re.search(pattern, raw_text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    val = float(match.group(1))
-                    if test_name == "WBC Count" and val > 100: val = val / 1000
-                    results.append({
-                        "Parameter": test_name, 
-                        "Value": val, 
-                        "Unit": info["unit"], 
-                        "Status": interpret_value(test_name, val)
-                    })
-                    break
+        file_bytes = uploaded_file.getvalue()
+        try:
+            results = report_results(file_digest(file_bytes), file_bytes)
+        except IncompleteText as e:
+            st.warning(f"{e}; results may be missing values.")
+            results = extract_results(e.text)
 
         if results:
             st.subheader("Diagnostic Summary")
             df = pd.DataFrame(results)
+            df['Status'] = interpret_values(df['Parameter'], df['Value'])
             df['Value'] = df['Value'].apply(lambda x: f"{x:.2f}")
             def style_status(val):
                 if "High" in val or "Low" in val: color = '#ffcccc' 
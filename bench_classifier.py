@@ -0,0 +1,90 @@
+"""
+Benchmark: per-value Python branching vs the vectorized RangeTable.
+
+Uses the two reference styles in the apps (app.py's low/high and
+normal/medium TESTS, Agent.py's min/max standards), checks that both
+paths agree on every value, then times them.
+
+    python bench_classifier.py [--rows 500000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.classifier import BORDERLINE, HIGH, LOW, NORMAL, RangeTable, min_max_rule
+
+TESTS = {
+    "Hemoglobin": {"low": 13.0, "high": 17.0, "unit": "g/dL"},
+    "Glucose": {"normal": 100, "medium": 125, "unit": "mg/dL"},
+    "Cholesterol": {"normal": 200, "medium": 239, "unit": "mg/dL"},
+    "Creatinine": {"low": 0.7, "high": 1.3, "unit": "mg/dL"},
+    "Platelets": {"low": 150, "high": 450, "unit": "10^3/µL"},
+    "WBC Count": {"low": 4.0, "high": 11.0, "unit": "10^3/µL"},
+}
+
+
+def legacy_status(test_name, val):
+    # the branching of app.interpret_value, as codes
+    ref = TESTS[test_name]
+    if "medium" in ref:
+        if val <= ref["normal"]: return NORMAL
+        elif val <= ref["medium"]: return BORDERLINE
+        else: return HIGH
+    else:
+        if val < ref["low"]: return LOW
+        if val > ref["high"]: return HIGH
+        return NORMAL
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = np.array(list(TESTS), dtype=object)
+    analytes = names[rng.integers(0, len(names), args.rows)]
+    # values spread around each test's upper limit, so every band occurs
+    centre = np.array([TESTS[a].get("high", TESTS[a].get("medium")) for a in analytes])
+    values = np.round(centre * rng.uniform(0.3, 1.6, args.rows), 2)
+
+    table = RangeTable.from_dict(TESTS)
+
+    start = time.perf_counter()
+    expected = np.array([legacy_status(a, v) for a, v in zip(analytes, values)], dtype=np.int8)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    codes = table.classify(analytes, values)
+    vector_time = time.perf_counter() - start
+
+    assert np.array_equal(codes, expected), "vectorized codes differ from the legacy branching"
+
+    # cohort tables usually hold the analyte column as a category
+    categorical = pd.Categorical(analytes)
+    start = time.perf_counter()
+    codes = table.classify(categorical, values)
+    categorical_time = time.perf_counter() - start
+
+    assert np.array_equal(codes, expected), "categorical input gives different codes"
+
+    # sex- and age-specific rules override the general one where they match
+    table = RangeTable([
+        min_max_rule("Hemoglobin", 12.0, 17.5),
+        min_max_rule("Hemoglobin", 13.5, 17.5, sex="M"),
+        min_max_rule("Hemoglobin", 11.0, 16.0, age_max=12),
+    ])
+    check = table.classify(["Hemoglobin"] * 4, [13.0] * 4, ["male", "F", None, "M"], [40, 40, 40, 8])
+    assert list(check) == [LOW, NORMAL, NORMAL, NORMAL], check
+
+    print(f"rows          : {args.rows}")
+    print(f"python loop   : {loop_time:.2f} s")
+    print(f"vectorized    : {vector_time:.3f} s ({loop_time / vector_time:.0f}x faster)")
+    print(f"categorical   : {categorical_time:.3f} s ({loop_time / categorical_time:.0f}x faster)")
+    print("codes identical: yes")
+
+
+if __name__ == "__main__":
+    main()
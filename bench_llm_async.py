@@ -0,0 +1,149 @@
+"""
+Benchmark: serial vs concurrent LLM calls against a local fake server.
+
+The server answers like FakeLLMClient after a random delay and rejects a
+share of requests with HTTP 429 (plus every request above its own rate
+limit), so the retry, backoff and rate-limit paths are all exercised. Every
+response is checked against the in-process fake. A second run with a client
+that ignores its timeout checks that a batch still ends close to the timeout.
+
+    python bench_llm_async.py [--reports 200] [--concurrency 16] [--rate 50]
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.llm import FakeLLMClient, HTTPLLMClient
+from src.llm_async import CallSettings, generate_all, generate_stream
+
+
+def make_server(latency: float, reject_share: float, server_rate: float) -> ThreadingHTTPServer:
+    fake = FakeLLMClient()
+    lock = threading.Lock()
+    recent = []
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status: int, body: dict, headers=()):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+            # sliding one-second window; over the limit -> 429
+            with lock:
+                now = time.monotonic()
+                recent[:] = [t for t in recent if now - t < 1.0]
+                over_limit = len(recent) >= server_rate
+                if not over_limit:
+                    recent.append(now)
+
+            if over_limit or random.random() < reject_share:
+                self.server.rejected += 1
+                return self.reply(429, {"error": "quota"}, [("Retry-After", "0.2")])
+
+            time.sleep(random.uniform(0.5, 1.5) * latency)
+            self.reply(200, {"text": fake.generate(request["prompt"])})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.rejected = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def report_prompts(count: int):
+    prompts = []
+    for i in range(count):
+        prompts.append(
+            "Standardize names to: Hemoglobin, Glucose, Platelets.\n"
+            f"Text: Hemoglobin {12 + i % 5}.{i % 10} g/dL\nGlucose {80 + i} mg/dL\nPlatelets {150 + i} x10^3/uL"
+        )
+    return prompts
+
+
+async def run(client, prompts, settings):
+    results = []
+    start = time.perf_counter()
+
+    async for result in generate_stream(client, prompts, settings):
+        results.append(result)
+        if len(results) % max(len(prompts) // 10, 1) == 0:
+            print(f"  {len(results)}/{len(prompts)} done after {time.perf_counter() - start:.1f}s", flush=True)
+
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="mean server latency in seconds")
+    parser.add_argument("--reject-share", type=float, default=0.1, help="share of random 429s")
+    parser.add_argument("--server-rate", type=float, default=60, help="server limit, requests/second")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=50, help="client limit, requests/second")
+    args = parser.parse_args()
+
+    server = make_server(args.latency, args.reject_share, args.server_rate)
+    client = HTTPLLMClient(url=f"http://127.0.0.1:{server.server_port}/generate", timeout=10)
+    prompts = report_prompts(args.reports)
+    expected = [FakeLLMClient().generate(p) for p in prompts]
+
+    # the old behaviour: one blocking call after another (no 429s, no retries)
+    serial_server = make_server(args.latency, 0.0, float("inf"))
+    serial_client = HTTPLLMClient(url=f"http://127.0.0.1:{serial_server.server_port}/generate")
+    sample = min(args.reports, 20)
+    start = time.perf_counter()
+    for prompt in prompts[:sample]:
+        serial_client.generate(prompt)
+    serial_per_report = (time.perf_counter() - start) / sample
+
+    print(f"concurrent run: {args.reports} reports, concurrency {args.concurrency}, {args.rate}/s")
+    settings = CallSettings(concurrency=args.concurrency, rate=args.rate, burst=args.concurrency,
+                            timeout=10, retries=8, backoff=0.2, max_backoff=2.0)
+    results, elapsed = asyncio.run(run(client, prompts, settings))
+
+    failed = [r for r in results if r.error]
+    wrong = [r for r in results if not r.error and r.text != expected[r.index]]
+
+    print(f"serial (estimated)  : {serial_per_report * args.reports:.1f} s")
+    print(f"concurrent          : {elapsed:.1f} s ({args.reports / elapsed:.1f} reports/s)")
+    print(f"429s from server    : {server.rejected}")
+    print(f"retried calls       : {sum(r.attempts > 1 for r in results)}")
+    print(f"failed / mismatched : {len(failed)} / {len(wrong)}")
+
+    server.shutdown()
+    serial_server.shutdown()
+
+    # calls that hang past the timeout must not hold up the batch
+    timeout = 0.5
+    hung = FakeLLMClient(latency=timeout * 10)
+    start = time.perf_counter()
+    timed_out = generate_all(hung, prompts[:args.concurrency], CallSettings(
+        concurrency=args.concurrency, rate=args.rate, burst=args.concurrency, timeout=timeout, retries=0))
+    hung_elapsed = time.perf_counter() - start
+
+    print(f"hung calls          : {hung_elapsed:.2f} s with a {timeout:.1f} s timeout, "
+          f"{sum(isinstance(r.error, asyncio.TimeoutError) for r in timed_out)} timed out")
+
+    assert not failed and not wrong
+    assert all(isinstance(r.error, asyncio.TimeoutError) for r in timed_out)
+    assert hung_elapsed < timeout + 0.5
+
+
+if __name__ == "__main__":
+    main()
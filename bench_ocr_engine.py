@@ -0,0 +1,60 @@
+"""
+Benchmark: per-page OCR overhead of the pytesseract engine vs the batch engine.
+
+Short synthetic pages make Tesseract start-up (process spawn, language data
+load, temp-file round trip) dominate, which is what the batch engine saves.
+
+    python bench_ocr_engine.py [--pages 20] [--tesseract PATH]
+"""
+import argparse
+import time
+
+import pytesseract
+from PIL import Image, ImageDraw
+
+from src.ocr_engines import get_engine
+
+
+def short_pages(count: int):
+    pages = []
+    for i in range(count):
+        img = Image.new("L", (1240, 400), 255)
+        draw = ImageDraw.Draw(img)
+        draw.text((40, 40), f"Hemoglobin {12 + i % 4}.{i % 10} g/dL 13.0 - 17.0", fill=0)
+        draw.text((40, 120), f"Platelet Count {150 + i} 10^3/uL 150 - 450", fill=0)
+        pages.append(img)
+    return pages
+
+
+def timed(engine_name: str, pages):
+    engine = get_engine(engine_name)
+    start = time.perf_counter()
+    texts = engine.image_to_string(pages)
+    return time.perf_counter() - start, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--tesseract", help="path to the tesseract executable")
+    args = parser.parse_args()
+
+    if args.tesseract:
+        pytesseract.pytesseract.tesseract_cmd = args.tesseract
+
+    pages = short_pages(args.pages)
+
+    single_time, single = timed("pytesseract", pages)
+    batch_time, batch = timed("tesseract-batch", pages)
+
+    same = sum(a.strip() == b.strip() for a, b in zip(single, batch))
+
+    print(f"pages               : {args.pages}")
+    print(f"pytesseract         : {single_time:.2f} s ({single_time / args.pages * 1000:.0f} ms/page)")
+    print(f"tesseract-batch     : {batch_time:.2f} s ({batch_time / args.pages * 1000:.0f} ms/page)")
+    print(f"overhead saved/page : {(single_time - batch_time) / args.pages * 1000:.0f} ms")
+    print(f"identical text      : {same}/{args.pages} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: per-alias DOTALL regex scans vs the one-pass DocumentIndex.
+
+Builds reports of growing size with app.py's TESTS aliases plus a set of
+extra aliases that never occur (the worst case for the regex loop, which
+scans the whole text once per alias), checks that both find the same
+values where the regex's answer is right, then times them.
+
+    python bench_token_index.py [--lines 2000 20000 200000] [--extra-aliases 200]
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+
+from src.token_index import DocumentIndex
+
+TESTS = {
+    "Hemoglobin": ["Hemoglobin", "Hb"],
+    "Glucose": ["Glucose", "FBS", "Sugar"],
+    "Cholesterol": ["Cholesterol", "Total Cholesterol"],
+    "Creatinine": ["Creatinine", "CREA"],
+    "Platelets": ["Platelets", "PLT", "Platelet Count"],
+    "WBC Count": ["Total Leucocyte Count", "WBC", "TLC"],
+}
+
+FILLER = [
+    "Sample collected at 08:45 by technician 12",
+    "Method: photometry, instrument ID 4471",
+    "This report is for informational purposes only",
+    "Page 3 of 7",
+]
+
+
+def legacy_values(text, tests):
+    # the loop app.py used before the index
+    found = {}
+    for test_name, aliases in tests.items():
+        for alias in aliases:
+            match = re.search(rf"{alias}.*?(\d+\.?\d*)", text, re.IGNORECASE | re.DOTALL)
+            if match:
+                found[test_name] = float(match.group(1))
+                break
+    return found
+
+
+def build_report(lines, rng):
+    values = {test: round(float(rng.uniform(1, 300)), 1) for test in TESTS}
+    body = [FILLER[i % len(FILLER)] for i in range(lines)]
+    # results sit at the end, as on a last-page summary
+    body += [f"{aliases[0]:<24}{values[test]:>8}  units" for test, aliases in TESTS.items()]
+    return "\n".join(body), values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[2_000, 20_000, 200_000])
+    parser.add_argument("--extra-aliases", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tests = dict(TESTS)
+    for i in range(args.extra_aliases):
+        tests[f"Analyte {i}"] = [f"analyte{i}", f"marker {i}"]
+
+    for lines in args.lines:
+        text, expected = build_report(lines, rng)
+
+        start = time.perf_counter()
+        legacy = legacy_values(text, tests)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed = DocumentIndex(text, tests).values()
+        index_time = time.perf_counter() - start
+
+        assert indexed == expected, (indexed, expected)
+        assert legacy == expected, (legacy, expected)
+
+        print(f"{len(text) / 1e6:6.2f} MB, {len(tests)} tests: regex {legacy_time:7.3f} s, "
+              f"index {index_time:6.3f} s ({legacy_time / index_time:.0f}x faster)")
+
+    print("values identical: yes")
+
+
+if __name__ == "__main__":
+    main()
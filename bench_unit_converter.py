@@ -0,0 +1,74 @@
+"""
+Benchmark: UnitConverter.convert per value vs UnitConverter.convert_many.
+
+Builds a column of results in a mix of unit spellings (SI, conventional,
+cells/cumm counts, unconvertible units), checks the bulk path against the
+scalar one on a sample, then times both.
+
+    python bench_unit_converter.py [--rows 1000000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.data_validation import UnitConverter
+
+# (parameter, unit, typical value in that unit)
+SAMPLES = [
+    ("hemoglobin", "g/dL", 14.0),
+    ("hemoglobin", "g/L", 140.0),
+    ("wbc_count", "cells/cumm", 7500.0),
+    ("wbc_count", "x10³/µL", 7.5),
+    ("platelet_count", "Lakhs/cumm", 2.5),
+    ("platelet_count", "10^9/L", 250.0),
+    ("fasting_plasma_glucose", "mmol/L", 5.4),
+    ("fasting_plasma_glucose", "mg/dl", 97.0),
+    ("hba1c", "mmol/mol", 40.0),
+    ("total_cholesterol", "mmol/L", 5.0),
+    ("triglycerides", "mmol/l", 1.5),
+    ("creatinine", "µmol/L", 80.0),
+    ("bilirubin_total", "umol/L", 12.0),
+    ("tsh", "mIU/L", 2.1),
+    ("sgpt", "IU/L", 30.0),
+    ("urea", "", 25.0),
+    ("creatinine", "furlongs", 1.0),   # not convertible
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pick = rng.integers(0, len(SAMPLES), args.rows)
+    parameters = np.array([s[0] for s in SAMPLES], dtype=object)[pick]
+    units = np.array([s[1] for s in SAMPLES], dtype=object)[pick]
+    values = np.array([s[2] for s in SAMPLES])[pick] * rng.uniform(0.5, 1.5, args.rows)
+
+    start = time.perf_counter()
+    result = UnitConverter.convert_many(parameters, values, units)
+    bulk_time = time.perf_counter() - start
+
+    sample = rng.choice(args.rows, size=min(args.rows, 100_000), replace=False)
+    start = time.perf_counter()
+    expected = [UnitConverter.convert(values[i], parameters[i], units[i]) for i in sample]
+    scalar_time = (time.perf_counter() - start) * args.rows / len(sample)
+
+    assert np.allclose(result.values[sample], [v for v, _ in expected]), "bulk values differ from convert()"
+    assert list(result.units[sample]) == [u for _, u in expected], "bulk units differ from convert()"
+    assert not result.ok[units == "furlongs"].any() and result.ok[units != "furlongs"].all()
+
+    wbc = parameters == "wbc_count"
+    assert ((result.values[wbc] > 3) & (result.values[wbc] < 12)).all(), "WBC counts not on the x10^3/uL scale"
+
+    print(f"rows           : {args.rows}")
+    print(f"convert() loop : {scalar_time:.2f} s (extrapolated from {len(sample)} rows)")
+    print(f"convert_many   : {bulk_time:.3f} s ({scalar_time / bulk_time:.0f}x faster)")
+    print(f"unconvertible  : {int((~result.ok).sum())} rows flagged")
+    print("values identical: yes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Range Classifier
+Vectorized LOW / NORMAL / BORDERLINE / HIGH classification of lab values
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Status codes; UNKNOWN marks an analyte without a range or a missing value
+UNKNOWN, LOW, NORMAL, BORDERLINE, HIGH = -1, 0, 1, 2, 3
+
+STATUS_NAMES = {UNKNOWN: "UNKNOWN", LOW: "LOW", NORMAL: "NORMAL", BORDERLINE: "BORDERLINE", HIGH: "HIGH"}
+
+ANY_SEX = "*"
+
+
+class RangeRule(NamedTuple):
+    """
+    Thresholds for one analyte, optionally limited to a sex and age band.
+
+    value < low -> LOW; value <= normal_max -> NORMAL; value <= borderline_max
+    -> BORDERLINE; above -> HIGH. A min/max range is low=min,
+    normal_max=borderline_max=max; a normal/medium range has low=-inf.
+    """
+    analyte: str
+    low: float
+    normal_max: float
+    borderline_max: float
+    sex: str = ANY_SEX            # "M", "F" or ANY_SEX
+    age_min: float = 0            # inclusive
+    age_max: float = np.inf       # exclusive
+    unit: str = ""
+
+    @property
+    def specificity(self) -> int:
+        return (self.sex != ANY_SEX) + (self.age_min > 0 or self.age_max < np.inf)
+
+
+def min_max_rule(analyte: str, low: float, high: float, **kwargs) -> RangeRule:
+    return RangeRule(analyte, low, high, high, **kwargs)
+
+
+def normal_medium_rule(analyte: str, normal: float, medium: float, **kwargs) -> RangeRule:
+    return RangeRule(analyte, -np.inf, normal, medium, **kwargs)
+
+
+def rule_from_dict(analyte: str, ref: Dict[str, Any]) -> RangeRule:
+    """Rule from either reference style in use: {"min", "max"} / {"low", "high"} or {"normal", "medium"}"""
+    extra = {"unit": ref.get("unit", "")}
+    if "medium" in ref:
+        return normal_medium_rule(analyte, ref["normal"], ref["medium"], **extra)
+    if "low" in ref:
+        return min_max_rule(analyte, ref["low"], ref["high"], **extra)
+    return min_max_rule(analyte, ref["min"], ref["max"], **extra)
+
+
+SEX_INDEX = {"": 0, "M": 1, "F": 2}
+
+
+def normalize_sex(sex: Any, size: int) -> np.ndarray:
+    """Array of "M" / "F" / "" from any mix of "male", "F", None, ..."""
+    if sex is None:
+        return np.full(size, "", dtype=object)
+    if isinstance(sex, str):
+        sex = [sex] * size
+    first = pd.Series(sex, dtype=object).fillna("").astype(str).str.strip().str[:1].str.upper()
+    return first.where(first.isin(["M", "F"]), "").to_numpy(dtype=object)
+
+
+class RangeTable:
+    """
+    Reference ranges compiled to flat arrays for constant-time lookup.
+
+    Thresholds live in arrays indexed [analyte id, sex bucket, age bucket].
+    Sex buckets are unknown / M / F; age buckets come from the age bands
+    the rules use, plus one bucket for an unknown age. Every cell holds the
+    most specific rule covering it (a sex- or age-specific rule beats the
+    general one), so classifying any number of values is a few gathers.
+
+    names maps extra spellings (e.g. "WBC Count") to analyte ids; lookups
+    are case-insensitive.
+    """
+
+    def __init__(self, rules: Iterable[RangeRule], names: Dict[str, str] = None):
+        self.rules: List[RangeRule] = sorted(rules, key=lambda r: r.specificity)
+        self.analytes = sorted({r.analyte for r in self.rules})
+        self._ids = {name: i for i, name in enumerate(self.analytes)}
+
+        self._codes = {name.lower(): i for name, i in self._ids.items()}
+        for name, analyte in (names or {}).items():
+            if analyte in self._ids:
+                self._codes[name.lower()] = self._ids[analyte]
+
+        bounds = {0.0, np.inf}
+        for rule in self.rules:
+            bounds.update((float(rule.age_min), float(rule.age_max)))
+        self.age_edges = np.array(sorted(bounds))
+        self._unknown_age = len(self.age_edges) - 1
+
+        # [threshold, analyte (+1 NaN row for unknown names), sex, age (+1 unknown)]
+        shape = (3, len(self.analytes) + 1, len(SEX_INDEX), len(self.age_edges))
+        self._thresholds = np.full(shape, np.nan)
+
+        for rule in self.rules:
+            sexes = list(SEX_INDEX.values()) if rule.sex == ANY_SEX else [SEX_INDEX[rule.sex]]
+            banded = rule.age_min > 0 or rule.age_max < np.inf
+            ages = [
+                k for k in range(self._unknown_age)
+                if rule.age_min <= self.age_edges[k] and self.age_edges[k + 1] <= rule.age_max
+            ]
+            if not banded:
+                ages.append(self._unknown_age)
+
+            # rules are sorted by specificity, so later (more specific) ones win
+            for sex_idx in sexes:
+                for age_idx in ages:
+                    self._thresholds[:, self._ids[rule.analyte], sex_idx, age_idx] = (
+                        rule.low, rule.normal_max, rule.borderline_max
+                    )
+
+        self._flat = self._thresholds.reshape(3, -1)
+
+    @classmethod
+    def from_dict(cls, references: Dict[str, Dict[str, Any]]) -> "RangeTable":
+        return cls(rule_from_dict(name, ref) for name, ref in references.items())
+
+    def analyte_ids(self, analytes) -> np.ndarray:
+        """Analyte id per name (-1 if unknown)"""
+        # factorize once, then look up each distinct name instead of every row;
+        # categorical input already is factorized
+        if isinstance(getattr(analytes, "dtype", None), pd.CategoricalDtype):
+            values = analytes.array if isinstance(analytes, pd.Series) else analytes
+            labels, uniques = values.codes, values.categories
+        else:
+            labels, uniques = pd.factorize(np.asarray(analytes, dtype=object))
+        lookup = np.array([self._codes.get(str(name).lower(), -1) for name in uniques] + [-1], dtype=np.int64)
+        return lookup[labels]
+
+    def _buckets(self, n: int, sex, age):
+        sex_idx = np.zeros(n, dtype=np.int64)
+        if sex is not None:
+            sexes = normalize_sex(sex, n)
+            sex_idx[sexes == "M"] = SEX_INDEX["M"]
+            sex_idx[sexes == "F"] = SEX_INDEX["F"]
+
+        if age is None:
+            return sex_idx, np.full(n, self._unknown_age, dtype=np.int64)
+
+        ages = np.broadcast_to(np.asarray(age, dtype=np.float64), (n,))
+        age_idx = np.searchsorted(self.age_edges, ages, side="right") - 1
+        age_idx[np.isnan(ages) | (ages < 0)] = self._unknown_age
+        return sex_idx, age_idx
+
+    def thresholds(self, analytes, sex=None, age=None):
+        """(low, normal_max, borderline_max) arrays, NaN where no rule applies"""
+        ids = self.analyte_ids(analytes)
+        _, analyte_count, sex_count, age_count = self._thresholds.shape
+
+        if sex is None and age is None:
+            # common case: one cell per analyte
+            cells = ids * (sex_count * age_count) + self._unknown_age
+        else:
+            sex_idx, age_idx = self._buckets(len(ids), sex, age)
+            cells = (ids * sex_count + sex_idx) * age_count + age_idx
+
+        # id -1 wraps to the trailing NaN analyte row
+        cells[ids < 0] += analyte_count * sex_count * age_count
+        low, normal_max, borderline_max = self._flat[:, cells]
+        return low, normal_max, borderline_max
+
+    def lookup(self, analyte: str, sex: str = None, age: float = None) -> Optional[RangeRule]:
+        """Thresholds for one analyte and person, or None if there is no range"""
+        low, normal_max, borderline_max = (float(t[0]) for t in self.thresholds([analyte], sex, age))
+        if np.isnan(normal_max):
+            return None
+        return RangeRule(self.analytes[self.analyte_ids([analyte])[0]], low, normal_max, borderline_max)
+
+    def classify(self, analytes, values, sex=None, age=None) -> np.ndarray:
+        """int8 status codes for parallel arrays of analyte names and values"""
+        values = np.asarray(values, dtype=np.float64)
+        low, normal_max, borderline_max = self.thresholds(analytes, sex, age)
+
+        # LOW + one step per threshold passed: low <= normal_max <= borderline_max
+        status = (values >= low).astype(np.int8)
+        status += values > normal_max
+        status += values > borderline_max
+
+        status[np.isnan(values) | np.isnan(normal_max)] = UNKNOWN
+        return status
+
+    def has_borderline(self, analytes, sex=None, age=None) -> np.ndarray:
+        """True where the analyte uses the normal/medium style"""
+        low, normal_max, borderline_max = self.thresholds(analytes, sex, age)
+        return borderline_max > normal_max
+
+    def classify_frame(self, df: pd.DataFrame, analyte: str = "analyte", value: str = "value",
+                       sex: Optional[str] = "sex", age: Optional[str] = "age") -> pd.Series:
+        """Status codes for a DataFrame of results (sex / age columns optional)"""
+        return pd.Series(
+            self.classify(
+                df[analyte].to_numpy(), df[value].to_numpy(),
+                df[sex].to_numpy() if sex in df else None,
+                df[age].to_numpy() if age in df else None,
+            ),
+            index=df.index, name="status",
+        )
+
+
+def format_status(codes, labels: Dict[int, str] = None) -> np.ndarray:
+    """Presentation step: map status codes to display labels"""
+    labels = labels or STATUS_NAMES
+    codes = np.asarray(codes)
+    out = np.full(codes.shape, labels.get(UNKNOWN, ""), dtype=object)
+    for code, label in labels.items():
+        out[codes == code] = label
+    return out
@@ -5,6 +5,9 @@ Extracts key blood parameters from parsed report content
 
 import re
 import logging
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 from difflib import SequenceMatcher
 
@@ -37,14 +40,47 @@ class ParameterExtractor:
         "mmol/l": "mmol/L",
     }
     
-    def __init__(self):
-        """Initialize parameter extractor"""
+    # Minimum similarity for a fuzzy alias match
+    FUZZY_THRESHOLD = 0.7
+    # Character n-gram size used by the fuzzy candidate index
+    NGRAM_SIZE = 3
+    # Bounded memo of raw name -> canonical name
+    NAME_CACHE_SIZE = 4096
+    
+    def __init__(self, aliases: Optional[Dict[str, List[str]]] = None):
+        """Initialize parameter extractor; aliases defaults to PARAMETER_ALIASES"""
         self.reverse_aliases = {}
-        for param, aliases in self.PARAMETER_ALIASES.items():
-            for alias in aliases:
+        for param, names in (aliases or self.PARAMETER_ALIASES).items():
+            for alias in names:
                 self.reverse_aliases[alias.lower()] = param
+        
+        self._build_alias_index()
+        self._cached_lookup = lru_cache(maxsize=self.NAME_CACHE_SIZE)(self._lookup)
+    
+    def _ngrams(self, text: str) -> List[str]:
+        """Character n-grams of text, padded so short aliases still get grams"""
+        n = self.NGRAM_SIZE
+        padded = "\x02" * (n - 1) + text + "\x03" * (n - 1)
+        return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+    
+    def _build_alias_index(self):
+        """Build the n-gram postings and length index over reverse_aliases"""
+        self._aliases = list(self.reverse_aliases.items())
+        self._alias_chars = [Counter(alias) for alias, _ in self._aliases]
+        self._ngram_index = defaultdict(list)
+        
+        for i, (alias, _) in enumerate(self._aliases):
+            for gram in set(self._ngrams(alias)):
+                self._ngram_index[gram].append(i)
+        
+        by_length = sorted((len(alias), i) for i, (alias, _) in enumerate(self._aliases))
+        self._lengths = [length for length, _ in by_length]
+        self._length_order = [i for _, i in by_length]
     
     def normalize_parameter_name(self, name: str) -> Optional[str]:
+        return self._cached_lookup(name)
+    
+    def _lookup(self, name: str) -> Optional[str]:
         normalized = name.lower().strip()
         
         # Direct match in reverse aliases
@@ -52,16 +88,68 @@ class ParameterExtractor:
             return self.reverse_aliases[normalized]
         
         # Fuzzy match if no direct match
-        best_match = None
-        best_score = 0.7  # Minimum similarity threshold
+        return self._fuzzy_match(normalized)
+    
+    def _fuzzy_match(self, normalized: str) -> Optional[str]:
+        """
+        Best alias by SequenceMatcher ratio above FUZZY_THRESHOLD.
         
-        for alias, param in self.reverse_aliases.items():
-            score = SequenceMatcher(None, normalized, alias).ratio()
+        Gives the same answer as scoring every alias in insertion order and
+        keeping the first strictly better score. Aliases sharing n-grams with
+        the name are scored first to raise the bar quickly; every other alias
+        is only scored if its length and character-count upper bounds could
+        still beat the current best.
+        """
+        best_index = None
+        best_score = self.FUZZY_THRESHOLD
+        scored = set()
+        name_chars = Counter(normalized)
+        name_len = len(normalized)
+        
+        def beats(score: float, index: int) -> bool:
             if score > best_score:
+                return True
+            return best_index is not None and score == best_score and index < best_index
+        
+        def consider(index: int):
+            nonlocal best_index, best_score
+            scored.add(index)
+            alias = self._aliases[index][0]
+            total = name_len + len(alias)
+            
+            # Upper bounds on ratio(), cheapest first
+            if not beats(2.0 * min(name_len, len(alias)) / total, index):
+                return
+            common = sum((name_chars & self._alias_chars[index]).values())
+            if not beats(2.0 * common / total, index):
+                return
+            
+            score = SequenceMatcher(None, normalized, alias).ratio()
+            if beats(score, index):
                 best_score = score
-                best_match = param
+                best_index = index
+        
+        shared = Counter()
+        for gram in set(self._ngrams(normalized)):
+            for index in self._ngram_index.get(gram, ()):
+                shared[index] += 1
+        
+        for index, _ in shared.most_common():
+            consider(index)
+        
+        # Only aliases whose length keeps 2*min/(la+lb) >= best can still win
+        low = name_len * best_score / (2.0 - best_score) - 1e-9
+        high = name_len * (2.0 - best_score) / best_score + 1e-9
+        start = bisect_left(self._lengths, low)
+        stop = bisect_right(self._lengths, high)
+        
+        for index in self._length_order[start:stop]:
+            if index not in scored:
+                consider(index)
         
-        return best_match
+        if best_index is None:
+            return None
+        return self._aliases[best_index][1]
     
     def normalize_unit(self, unit: str) -> str:
         normalized = unit.lower().strip()
@@ -4,72 +4,35 @@ Validates and standardizes extracted blood parameter data
 """
 
 import logging
-import json
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 
-logger = logging.getLogger(__name__)
-
+from .reference_ranges import get_registry
+from .units import UNIT_ALIASES, Conversion, UnitConverter, canonical_unit
 
-class UnitConverter:
-    """Converts between different measurement units"""
-    
-    # Conversion factors to standard units
-    CONVERSIONS = {
-        "hemoglobin": {
-            "g/dl": 1.0,
-            "g/100ml": 1.0,
-            "mmol/l": 0.06206,  # To g/dL
-        },
-        "glucose": {
-            "mg/dl": 1.0,
-            "mmol/l": 18.0182,  # To mg/dL
-        },
-        "cholesterol": {
-            "mg/dl": 1.0,
-            "mmol/l": 38.67,  # To mg/dL
-        },
-        "triglycerides": {
-            "mg/dl": 1.0,
-            "mmol/l": 88.57,  # To mg/dL
-        },
-    }
-    
-    @staticmethod
-    def convert(value: float, parameter: str, from_unit: str, to_unit: str = None) -> Tuple[float, str]:
-        from_unit = from_unit.lower().strip()
-        
-        # If unit is already standard or recognized, return as-is
-        return value, from_unit
+logger = logging.getLogger(__name__)
 
 
 class DataValidator:
     """Validates extracted blood parameters"""
     
     def __init__(self, reference_ranges_path: Optional[Path] = None):
-        self.reference_ranges = self._load_reference_ranges(reference_ranges_path)
         self.logger = logging.getLogger(__name__)
+        self.registry = None
+        self.reference_ranges = self._load_reference_ranges(reference_ranges_path)
     
     def _load_reference_ranges(self, reference_ranges_path: Optional[Path]) -> Dict[str, Any]:
-        """Load reference ranges from JSON file"""
+        """Load reference ranges through the shared registry (parsed once per process)"""
         try:
             if reference_ranges_path and Path(reference_ranges_path).exists():
-                with open(reference_ranges_path, 'r') as f:
-                    return json.load(f)
+                self.registry = get_registry(str(reference_ranges_path))
+                return self.registry.as_blood_parameters()
         except Exception as e:
             self.logger.warning(f"Could not load reference ranges: {str(e)}")
         
-        # Return minimal default ranges if file not found
-        return {
-            "blood_parameters": {
-                "hemoglobin": {
-                    "reference_ranges": {
-                        "male": {"min": 13.5, "max": 17.5},
-                        "female": {"min": 12.0, "max": 15.5}
-                    }
-                }
-            }
-        }
+        # Fall back to the project's default ranges if the file is missing or invalid
+        self.registry = get_registry()
+        return self.registry.as_blood_parameters()
     
     def validate_parameter(self, parameter: Dict[str, Any]) -> Dict[str, Any]:
         param_name = parameter.get("parameter")
@@ -146,11 +109,19 @@ class DataStandardizer:
     ) -> List[Dict[str, Any]]:
         standardized = []
         
-        for param in parameters:
+        # values and units in the standard unit, converted as one batch
+        conversion = UnitConverter.convert_many(
+            [param.get("parameter") for param in parameters],
+            [float(param.get("value", 0)) for param in parameters],
+            [param.get("unit", "").strip() for param in parameters],
+        )
+        
+        for param, value, unit, ok in zip(parameters, *conversion):
             standardized_param = {
                 "parameter": param.get("parameter"),
-                "value": float(param.get("value", 0)),
-                "unit": param.get("unit", "").strip(),
+                "value": float(value),
+                "unit": unit,
+                "unit_valid": bool(ok),
                 "raw_name": param.get("raw_name", ""),
                 "timestamp": None,
                 "source": param.get("source_line", "")
@@ -0,0 +1,147 @@
+"""
+Disk Cache
+Small SQLite-backed key/value store with size-bounded LRU eviction
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    Persistent string cache shared safely between processes.
+
+    Every operation opens its own connection, so instances can be used from
+    several threads, and SQLite's locking (WAL journal, busy timeout)
+    serializes writers from different processes. Reads refresh an entry's
+    access time; once the stored text exceeds max_bytes the least recently
+    used entries are dropped. With a ttl (seconds), entries also expire that
+    long after they were written.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            accessed REAL NOT NULL,
+            expires REAL
+        );
+        CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, timeout: float = 30.0,
+                 ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.ttl = ttl
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            # caches created before entries could expire
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "expires" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN expires REAL")
+            self._ready = True
+
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        found = {}
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" * len(keys))
+            now = time.time()
+            rows = conn.execute(
+                f"SELECT key, value FROM entries WHERE key IN ({placeholders})"
+                f" AND (expires IS NULL OR expires > ?)", keys + [now]
+            ).fetchall()
+            found = dict(rows)
+
+            if found:
+                hit_keys = list(found)
+                conn.execute(
+                    f"UPDATE entries SET accessed = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                    [now] + hit_keys
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed: {e}")
+        finally:
+            conn.close()
+
+        return found
+
+    def set(self, key: str, value: str):
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[Tuple[str, str]]):
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        rows = [(key, value, len(value.encode("utf-8")), now, expires) for key, value in items]
+        if not rows:
+            return
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed, expires) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop expired entries, then least recently used ones until the total fits max_bytes"""
+        conn.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        logger.debug(f"Evicted {len(doomed)} cache entries")
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM entries")
+        finally:
+            conn.close()
@@ -0,0 +1,213 @@
+"""
+LLM Clients
+Interchangeable text-generation backends and a persistent response cache
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from .disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+
+class TransientLLMError(RuntimeError):
+    """A failure worth retrying (server error, dropped connection)"""
+
+
+class RateLimitError(TransientLLMError):
+    """The backend refused the call for quota reasons (HTTP 429)"""
+
+    def __init__(self, message: str = "rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMClient(ABC):
+    """
+    Base class for LLM backends.
+
+    generate takes a prompt and returns the raw response text, giving up
+    after timeout seconds where the backend supports it (None leaves the
+    backend's default); src.llm_async runs it in worker threads. model_name identifies the model for cache keys, so responses from
+    different backends or models are never mixed up.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name: str = "", **options):
+        self.model_name = model_name
+
+    @abstractmethod
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Raw response text for prompt"""
+
+
+class GeminiClient(LLMClient):
+    """Google Gemini via google-generativeai; configured once per instance"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = "gemini-2.5-flash", api_key: str = "",
+                 generation_config: Optional[Dict[str, Any]] = None, **options):
+        super().__init__(model_name)
+
+        # imported here so the fake backend works without the SDK installed
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config or {"response_mime_type": "application/json"}
+        )
+
+    @staticmethod
+    def _translate(error: Exception) -> Exception:
+        # google.api_core errors carry the HTTP status as .code
+        code = getattr(error, "code", None)
+        if code == 429:
+            return RateLimitError(str(error))
+        if isinstance(code, int) and code >= 500:
+            return TransientLLMError(str(error))
+        return error
+
+    # blocking on purpose: the SDK's async transport binds to the first event
+    # loop that uses it, and this client outlives the loop generate_all
+    # starts for each batch
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        request_options = {"timeout": timeout} if timeout else None
+        try:
+            return self._model.generate_content(prompt, request_options=request_options).text
+        except Exception as e:
+            raise self._translate(e) from e
+
+
+class HTTPLLMClient(LLMClient):
+    """
+    Minimal JSON-over-HTTP backend: POST {"model", "prompt"} to url and read
+    {"text"} back. Used for self-hosted models and the local fake server in
+    bench_llm_async.py.
+    """
+
+    name = "http"
+
+    def __init__(self, model_name: str = "http", url: str = "http://127.0.0.1:8765/generate",
+                 timeout: float = 60.0, **options):
+        super().__init__(model_name)
+        self.url = url
+        self.timeout = timeout
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        body = json.dumps({"model": self.model_name, "prompt": prompt}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())["text"]
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                retry_after = e.headers.get("Retry-After")
+                raise RateLimitError(f"HTTP 429 from {self.url}",
+                                     float(retry_after) if retry_after else None) from e
+            if e.code >= 500:
+                raise TransientLLMError(f"HTTP {e.code} from {self.url}") from e
+            raise
+        except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+            raise TransientLLMError(f"{self.url}: {e}") from e
+
+
+class FakeLLMClient(LLMClient):
+    """
+    Deterministic offline stand-in for load tests and development.
+
+    Reads "<test name> <number> <unit>" lines from the report text after the
+    prompt's "Text:" marker and answers in the blood-report JSON layout,
+    spelling names as in the prompt's "Standardize names to:" list when they
+    match it. The same prompt always gives the same response; latency
+    (seconds) simulates a network round trip, and timeout is ignored, as
+    by a backend that cannot be interrupted.
+    """
+
+    name = "fake"
+
+    RESULT_LINE = re.compile(
+        r"^\s*([A-Za-z][A-Za-z .()/-]*?)\s*[:\-]?\s+(\d+(?:\.\d+)?)\s*([A-Za-z%^/0-9.]+)?",
+        re.MULTILINE
+    )
+
+    def __init__(self, model_name: str = "fake", latency: float = 0.0, **options):
+        super().__init__(model_name)
+        self.latency = latency
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+
+        standard = re.search(r"Standardize names to:\s*(.+?)\.?\s*$", prompt, re.MULTILINE)
+        canonical = {
+            name.strip().lower(): name.strip()
+            for name in (standard.group(1).split(",") if standard else [])
+        }
+
+        text = prompt.rsplit("Text:", 1)[-1]
+        results = [
+            {
+                "Test": canonical.get(name.strip().lower(), name.strip().title()),
+                "Value": float(value),
+                "Unit": unit or "",
+            }
+            for name, value, unit in self.RESULT_LINE.findall(text)
+        ]
+
+        return json.dumps({"is_blood_report": bool(results), "results": results})
+
+
+CLIENTS = {
+    GeminiClient.name: GeminiClient,
+    FakeLLMClient.name: FakeLLMClient,
+    HTTPLLMClient.name: HTTPLLMClient,
+}
+
+_instances: Dict[Tuple, LLMClient] = {}
+
+
+def get_client(name: str = GeminiClient.name, **options) -> LLMClient:
+    """Client by backend name, created once per process and options, then reused"""
+    key = (name, tuple(sorted(options.items())))
+    if key not in _instances:
+        if name not in CLIENTS:
+            raise ValueError(f"Unknown LLM backend '{name}'. Available: {', '.join(CLIENTS)}")
+        _instances[key] = CLIENTS[name](**options)
+    return _instances[key]
+
+
+def normalize_report_text(text: str) -> str:
+    """Whitespace-insensitive form of report text, used for prompts and cache keys"""
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class LLMResponseCache(DiskCache):
+    """
+    Raw LLM responses keyed by model, prompt template version and report text.
+
+    Bump the prompt version whenever the template changes so old answers
+    are not served for the new prompt.
+    """
+
+    def _key(self, model_name: str, prompt_version: Any, text: str) -> str:
+        payload = json.dumps([model_name, str(prompt_version), normalize_report_text(text)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_response(self, model_name: str, prompt_version: Any, text: str) -> Optional[str]:
+        return self.get(self._key(model_name, prompt_version, text))
+
+    def put_response(self, model_name: str, prompt_version: Any, text: str, response: str):
+        self.set(self._key(model_name, prompt_version, text), response)
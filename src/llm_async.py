@@ -0,0 +1,157 @@
+"""
+Concurrent LLM Calls
+Runs many prompts through one client with a concurrency cap, a token-bucket
+rate limit, per-call timeouts and jittered retries
+"""
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+from .llm import LLMClient, RateLimitError, TransientLLMError
+
+logger = logging.getLogger(__name__)
+
+
+class CallSettings(NamedTuple):
+    """How prompts are scheduled; defaults suit a free-tier Gemini key"""
+    concurrency: int = 4          # calls in flight at once
+    rate: float = 2.0             # calls started per second, on average
+    burst: int = 4                # calls that may start back to back
+    timeout: float = 60.0         # seconds per attempt
+    retries: int = 4              # extra attempts after the first
+    backoff: float = 1.0          # first retry delay ceiling in seconds, doubled per attempt
+    max_backoff: float = 30.0
+
+
+class CallResult(NamedTuple):
+    index: int                    # position of the prompt in the input
+    text: Optional[str]           # raw response, None on failure
+    error: Optional[Exception]
+    attempts: int
+    seconds: float
+
+
+class TokenBucket:
+    """
+    Async token bucket: holds up to `capacity` tokens and refills at `rate`
+    per second; acquire waits until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                # holding the lock while waiting keeps callers first-come, first-served
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def retry_delay(attempt: int, settings: CallSettings, error: Exception) -> float:
+    """Full-jitter exponential backoff, never shorter than a server's Retry-After"""
+    delay = random.uniform(0, min(settings.max_backoff, settings.backoff * 2 ** attempt))
+    retry_after = getattr(error, "retry_after", None)
+    return max(delay, retry_after) if retry_after else delay
+
+
+def _release_when_done(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore):
+    """Done-callback for a worker-thread future that frees its concurrency slot"""
+
+    def release(_):
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            pass  # the batch is over and its loop closed
+
+    return release
+
+
+async def _call(client: LLMClient, index: int, prompt: str, settings: CallSettings,
+                bucket: TokenBucket, semaphore: asyncio.Semaphore, executor: Executor) -> CallResult:
+    start = time.perf_counter()
+    attempt = 0
+    loop = asyncio.get_running_loop()
+
+    while True:
+        await semaphore.acquire()
+        try:
+            await bucket.acquire()
+        except BaseException:
+            semaphore.release()
+            raise
+
+        # a thread cannot be stopped, so a timed-out call keeps its slot
+        # until the thread returns; the client is also given the timeout
+        future = executor.submit(client.generate, prompt, settings.timeout)
+        future.add_done_callback(_release_when_done(loop, semaphore))
+        try:
+            text = await asyncio.wait_for(asyncio.wrap_future(future), settings.timeout)
+            return CallResult(index, text, None, attempt + 1, time.perf_counter() - start)
+
+        except (RateLimitError, TransientLLMError, asyncio.TimeoutError) as e:
+            if attempt >= settings.retries:
+                return CallResult(index, None, e, attempt + 1, time.perf_counter() - start)
+
+            delay = retry_delay(attempt, settings, e)
+            logger.info(f"Prompt {index}: {type(e).__name__}, retry {attempt + 1} in {delay:.1f}s")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        except Exception as e:
+            # bad request, auth, malformed prompt: retrying will not help
+            return CallResult(index, None, e, attempt + 1, time.perf_counter() - start)
+
+
+async def generate_stream(client: LLMClient, prompts: List[str],
+                          settings: CallSettings = CallSettings()) -> AsyncIterator[CallResult]:
+    """
+    Yield a CallResult per prompt as each one finishes (not in input order).
+
+    Failures are yielded as results with .error set rather than raised, so
+    one bad report does not stop the batch. Calls run on the stream's own
+    worker threads; ones still stuck past their timeout are abandoned when
+    it ends rather than waited for.
+    """
+    bucket = TokenBucket(settings.rate, settings.burst)
+    semaphore = asyncio.Semaphore(settings.concurrency)
+    executor = ThreadPoolExecutor(settings.concurrency, thread_name_prefix="llm-call")
+
+    tasks = [
+        asyncio.ensure_future(_call(client, i, prompt, settings, bucket, semaphore, executor))
+        for i, prompt in enumerate(prompts)
+    ]
+
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # the consumer stopped early: do not leave calls running
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def generate_all(client: LLMClient, prompts: List[str],
+                 settings: CallSettings = CallSettings()) -> List[CallResult]:
+    """Blocking form of generate_stream; results come back in input order"""
+
+    async def collect():
+        return [result async for result in generate_stream(client, prompts, settings)]
+
+    return sorted(asyncio.run(collect()), key=lambda r: r.index)
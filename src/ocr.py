@@ -0,0 +1,314 @@
+"""
+OCR Utilities
+Runs Tesseract over page images, optionally across a process pool
+"""
+
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import pytesseract
+
+from .ocr_engines import PytesseractEngine, get_engine
+
+logger = logging.getLogger(__name__)
+
+# Extra seconds the pool waits past the Tesseract timeout before giving up
+POOL_GRACE_SECONDS = 10
+# Region-of-interest OCR yielding no more characters than this falls back to the full page
+ROI_MIN_CHARS = 20
+
+
+class OCRSettings(NamedTuple):
+    """Everything a (possibly remote) worker needs to OCR one page"""
+    tesseract_cmd: str
+    config: str = ""
+    timeout: Optional[float] = None
+    # Render resolutions to try, lowest first (only for render callables)
+    dpi_steps: Tuple[int, ...] = (300,)
+    # Mean word confidence at which a lower-DPI result is accepted
+    min_confidence: float = 0.0
+    # OCR only the detected result tables instead of the whole page
+    roi: bool = False
+    # Backend name from src.ocr_engines.ENGINES
+    engine: str = PytesseractEngine.name
+
+
+@lru_cache(maxsize=None)
+def tesseract_version() -> str:
+    """Installed Tesseract version, used to key cached OCR output"""
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception as e:
+        logger.warning(f"Could not read Tesseract version: {e}")
+        return "unknown"
+
+
+def _is_timeout(error: Exception) -> bool:
+    """pytesseract reports a killed Tesseract run as RuntimeError('... timeout')"""
+    return isinstance(error, RuntimeError) and "timeout" in str(error).lower()
+
+
+def data_to_text(data: Dict[str, List[Any]]) -> Tuple[str, float]:
+    """
+    Rebuild page text from image_to_data output and return it with the mean
+    word confidence (0-100; 0 when no words were recognised).
+    """
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences = []
+
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+
+    text_lines = []
+    previous = None
+    for key in sorted(lines):
+        # blank line between paragraphs, like image_to_string
+        if previous is not None and key[:2] != previous[:2]:
+            text_lines.append("")
+        text_lines.append(" ".join(lines[key]))
+        previous = key
+
+    mean_conf = sum(confidences) / len(confidences) if confidences else 0.0
+    return "\n".join(text_lines), mean_conf
+
+
+def ocr_with_confidence(image: Any, config: str = "", timeout: Optional[float] = None,
+                        engine: str = PytesseractEngine.name) -> Tuple[str, float]:
+    data = get_engine(engine).image_to_data([image], config, timeout)[0]
+    return data_to_text(data)
+
+
+def recognise_many(images: Sequence[Any], settings: OCRSettings) -> List[Tuple[str, float]]:
+    """
+    OCR images in one engine call and return (text, mean confidence) for
+    each. With settings.roi only the detected table regions are read, falling
+    back to the full page when none are found or they hold almost no text.
+    """
+    engine = get_engine(settings.engine)
+    images = list(images)
+    results: List[Optional[Tuple[str, float]]] = [None] * len(images)
+
+    if settings.roi:
+        # OpenCV is only needed for region-of-interest OCR
+        from .preprocess import table_crops
+
+        crops_per_page = [table_crops(image) for image in images]
+        flat = [crop for crops in crops_per_page for crop in crops]
+        flat_results = [
+            data_to_text(data)
+            for data in engine.image_to_data(flat, settings.config, settings.timeout)
+        ] if flat else []
+
+        offset = 0
+        for i, crops in enumerate(crops_per_page):
+            page_results = flat_results[offset:offset + len(crops)]
+            offset += len(crops)
+            text = "\n".join(t for t, _ in page_results)
+
+            if crops and len(text.strip()) > ROI_MIN_CHARS:
+                results[i] = (text, sum(c for _, c in page_results) / len(page_results))
+            else:
+                logger.debug(f"Table regions on page {i + 1} held too little text, OCR'ing the full page")
+
+    full_pages = [i for i, result in enumerate(results) if result is None]
+    if full_pages:
+        datas = engine.image_to_data([images[i] for i in full_pages], settings.config, settings.timeout)
+        for i, data in zip(full_pages, datas):
+            results[i] = data_to_text(data)
+
+    return results
+
+
+def recognise(image: Any, settings: OCRSettings) -> Tuple[str, float]:
+    return recognise_many([image], settings)[0]
+
+
+def ocr_adaptive(renders: Sequence[Callable[[int], Any]], settings: OCRSettings) -> List[str]:
+    """
+    Render pages at the lowest DPI in settings.dpi_steps and OCR them; only
+    pages whose confidence stays below min_confidence are re-rendered at the
+    next DPI. The most confident result per page wins.
+    """
+    best = [("", -1.0) for _ in renders]
+    pending = list(range(len(renders)))
+
+    for dpi in settings.dpi_steps:
+        if not pending:
+            break
+
+        images = [renders[i](dpi) for i in pending]
+        results = recognise_many(images, settings)
+        del images
+
+        still_low = []
+        for i, (text, conf) in zip(pending, results):
+            if conf > best[i][1]:
+                best[i] = (text, conf)
+            if conf < settings.min_confidence:
+                still_low.append(i)
+
+        if still_low:
+            logger.debug(f"{len(still_low)} page(s) below confidence {settings.min_confidence} at {dpi} DPI")
+        pending = still_low
+
+    return [text for text, _ in best]
+
+
+def _ocr_chunk(pages: Sequence[Any], settings: OCRSettings) -> List[str]:
+    """
+    OCR several pages with as few engine calls as possible. Each page is an
+    image, or a render(dpi) callable for adaptive DPI.
+    """
+    # Spawned workers do not inherit the path set by the calling app
+    pytesseract.pytesseract.tesseract_cmd = settings.tesseract_cmd
+
+    texts: List[Optional[str]] = [None] * len(pages)
+    renders = [i for i, page in enumerate(pages) if callable(page)]
+    images = [i for i, page in enumerate(pages) if not callable(page)]
+
+    if renders:
+        for i, text in zip(renders, ocr_adaptive([pages[i] for i in renders], settings)):
+            texts[i] = text
+
+    if images:
+        if settings.roi:
+            found = [text for text, _ in recognise_many([pages[i] for i in images], settings)]
+        else:
+            found = get_engine(settings.engine).image_to_string(
+                [pages[i] for i in images], settings.config, settings.timeout
+            )
+        for i, text in zip(images, found):
+            texts[i] = text
+
+    return texts
+
+
+def _ocr_page(page: Any, settings: OCRSettings) -> str:
+    """OCR one page; the entry point for pool workers, so it must stay picklable"""
+    return _ocr_chunk([page], settings)[0]
+
+
+def _ocr_serial(pages: Sequence[Any], texts: List[Optional[str]], settings: OCRSettings,
+                failed: Optional[List[int]] = None) -> List[str]:
+    pending = [i for i, text in enumerate(texts) if text is None]
+
+    # batch-capable engines get every pending page in one go first
+    if len(pending) > 1 and get_engine(settings.engine).batched:
+        try:
+            for i, text in zip(pending, _ocr_chunk([pages[i] for i in pending], settings)):
+                texts[i] = text
+        except Exception as e:
+            logger.warning(f"Batch OCR failed ({e!r}), retrying page by page")
+
+    for i, page in enumerate(pages):
+        if texts[i] is not None:
+            continue
+        try:
+            texts[i] = _ocr_page(page, settings)
+        except RuntimeError as e:
+            if not _is_timeout(e):
+                raise
+            logger.warning(f"OCR timed out after {settings.timeout}s on page {i + 1}, skipping it")
+            texts[i] = ""
+            if failed is not None:
+                failed.append(i)
+
+    return texts
+
+
+@contextmanager
+def ocr_pool(workers: int) -> Iterator[Optional[Executor]]:
+    """Process pool shared by several ocr_images calls; None when workers <= 1"""
+    if workers <= 1:
+        yield None
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield pool
+    finally:
+        # never block on a hung worker
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def ocr_images(
+    images: Sequence[Any],
+    workers: int = 1,
+    page_timeout: Optional[float] = None,
+    config: str = "",
+    pool: Optional[Executor] = None,
+    dpi_steps: Tuple[int, ...] = (300,),
+    min_confidence: float = 0.0,
+    roi: bool = False,
+    engine: str = PytesseractEngine.name,
+    failed: Optional[List[int]] = None
+) -> List[str]:
+    """
+    OCR pages and return their text in page order.
+
+    Each page is either an image or a picklable render(dpi) callable; the
+    latter are OCR'd adaptively (see ocr_adaptive) and rendered inside the
+    worker, so page images never cross process boundaries.
+
+    With workers > 1 (or a pool from ocr_pool) the pages are spread over a
+    process pool. A page that exceeds page_timeout comes back as empty text
+    and, if a failed list is given, its index is appended to it, so callers
+    can tell it from a blank page (and not cache it). If the pool itself
+    fails (worker crash, pickling error, hung worker), the pages it did not
+    finish are OCR'd serially in this process instead.
+    """
+    images = list(images)
+    texts: List[Optional[str]] = [None] * len(images)
+    settings = OCRSettings(
+        pytesseract.pytesseract.tesseract_cmd, config, page_timeout,
+        tuple(dpi_steps), min_confidence, roi, engine
+    )
+
+    if (pool is None and workers <= 1) or len(images) <= 1:
+        return _ocr_serial(images, texts, settings, failed)
+
+    # adaptive pages may render and OCR once per DPI step
+    wait = page_timeout * len(settings.dpi_steps) + POOL_GRACE_SECONDS if page_timeout else None
+    owns_pool = pool is None
+    if owns_pool:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(images)))
+    futures = []
+
+    try:
+        futures = [
+            pool.submit(_ocr_page, image, settings)
+            for image in images
+        ]
+        for i, future in enumerate(futures):
+            try:
+                texts[i] = future.result(timeout=wait)
+            except RuntimeError as e:
+                if not _is_timeout(e):
+                    raise
+                logger.warning(f"OCR timed out after {page_timeout}s on page {i + 1}, skipping it")
+                texts[i] = ""
+                if failed is not None:
+                    failed.append(i)
+    except Exception as e:
+        logger.warning(f"Parallel OCR failed ({e!r}), finishing remaining pages serially")
+        # keep whatever the pool already finished
+        for i, future in enumerate(futures):
+            if texts[i] is None and future.done() and not future.cancelled() \
+                    and future.exception() is None:
+                texts[i] = future.result()
+    finally:
+        if owns_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            for future in futures:
+                future.cancel()
+
+    return _ocr_serial(images, texts, settings, failed)
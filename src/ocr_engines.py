@@ -0,0 +1,171 @@
+"""
+OCR Engines
+Interchangeable Tesseract backends behind one batch-oriented interface
+"""
+
+import csv
+import logging
+import os
+import shlex
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+# Tesseract's default separator after each page of multi-image text output
+PAGE_SEPARATOR = "\f"
+
+TSV_INT_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num",
+                   "word_num", "left", "top", "width", "height")
+
+
+class OCREngine(ABC):
+    """
+    Base class for OCR backends.
+
+    Both methods take a list of images and return one result per image, so
+    backends that can amortize start-up cost over a batch are free to do so.
+    image_to_data returns pytesseract's Output.DICT layout.
+    """
+
+    name = "base"
+    # True when one call for many images costs less than one call per image
+    batched = False
+
+    @abstractmethod
+    def image_to_string(self, images: List[Any], config: str = "",
+                        timeout: Optional[float] = None) -> List[str]:
+        """Plain text of each image"""
+
+    @abstractmethod
+    def image_to_data(self, images: List[Any], config: str = "",
+                      timeout: Optional[float] = None) -> List[Dict[str, list]]:
+        """Word boxes and confidences of each image"""
+
+
+class PytesseractEngine(OCREngine):
+    """Default backend: one pytesseract call (one tesseract process) per image"""
+
+    name = "pytesseract"
+
+    def image_to_string(self, images, config="", timeout=None):
+        return [
+            pytesseract.image_to_string(image, config=config, timeout=timeout or 0)
+            for image in images
+        ]
+
+    def image_to_data(self, images, config="", timeout=None):
+        return [
+            pytesseract.image_to_data(
+                image, config=config, timeout=timeout or 0, output_type=pytesseract.Output.DICT
+            )
+            for image in images
+        ]
+
+
+class BatchTesseractEngine(OCREngine):
+    """
+    Runs a single tesseract process for a whole batch of images.
+
+    The images are written to a temporary directory and listed in a text
+    file that is handed to tesseract as its input; the combined output is
+    split back per page (form feeds for text, page_num for TSV). Language
+    data is loaded once per batch instead of once per image. The timeout
+    applies per image and is scaled by the batch size.
+    """
+
+    name = "tesseract-batch"
+    batched = True
+
+    def _run(self, images: List[Any], config: str, timeout: Optional[float], renderer: List[str]) -> str:
+        with tempfile.TemporaryDirectory(prefix="ocr_batch_") as tmp:
+            paths = []
+            for i, image in enumerate(images):
+                path = os.path.join(tmp, f"page_{i:05d}.png")
+                image.save(path)
+                paths.append(path)
+
+            list_path = os.path.join(tmp, "pages.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(paths) + "\n")
+
+            output_base = os.path.join(tmp, "output")
+            cmd = [pytesseract.pytesseract.tesseract_cmd, list_path, output_base]
+            cmd += shlex.split(config) + renderer
+
+            try:
+                subprocess.run(
+                    cmd, check=True, capture_output=True,
+                    timeout=timeout * len(images) if timeout else None
+                )
+            except subprocess.TimeoutExpired:
+                raise RuntimeError("Tesseract process timeout")
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(f"Tesseract failed: {e.stderr.decode(errors='replace').strip()}")
+
+            extension = ".tsv" if "tsv" in renderer else ".txt"
+            with open(output_base + extension, encoding="utf-8") as f:
+                return f.read()
+
+    def image_to_string(self, images, config="", timeout=None):
+        if not images:
+            return []
+
+        output = self._run(images, config, timeout, [])
+        pages = output.split(PAGE_SEPARATOR)
+
+        # one separator after every page leaves a trailing empty chunk
+        if len(pages) == len(images) + 1 and not pages[-1].strip():
+            pages = pages[:-1]
+
+        if len(pages) != len(images):
+            raise RuntimeError(f"Expected {len(images)} pages of OCR output, got {len(pages)}")
+
+        return pages
+
+    def image_to_data(self, images, config="", timeout=None):
+        if not images:
+            return []
+
+        output = self._run(images, config, timeout, ["tsv"])
+        rows = csv.reader(output.splitlines(), delimiter="\t", quoting=csv.QUOTE_NONE)
+        header = next(rows)
+
+        pages = [{column: [] for column in header} for _ in images]
+
+        for row in rows:
+            # the text column is dropped on rows without a word
+            row = row + [""] * (len(header) - len(row))
+            record = dict(zip(header, row))
+            page = pages[int(record["page_num"]) - 1]
+
+            for column in header:
+                value = record[column]
+                if column in TSV_INT_COLUMNS:
+                    value = int(value)
+                elif column == "conf":
+                    value = float(value)
+                page[column].append(value)
+
+        return pages
+
+
+ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    BatchTesseractEngine.name: BatchTesseractEngine,
+}
+
+_instances: Dict[str, OCREngine] = {}
+
+
+def get_engine(name: str = PytesseractEngine.name) -> OCREngine:
+    """Engine instance by name, created once per process and then reused"""
+    if name not in _instances:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown OCR engine '{name}'. Available: {', '.join(ENGINES)}")
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
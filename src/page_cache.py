@@ -0,0 +1,61 @@
+"""
+Page Text Cache
+Content-addressed cache of per-page raw text extracted from report files
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Union
+
+from .disk_cache import DiskCache
+
+# Bytes read at a time when hashing a file on disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(source: Union[str, bytes]) -> str:
+    """SHA-256 of a file's bytes, given either its path or the bytes themselves"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PageTextCache(DiskCache):
+    """
+    Per-page text keyed by file digest, page index and extraction settings.
+
+    Settings should hold everything that changes the output (DPI, OCR engine
+    version, backend), so changing any of them never serves stale text.
+    """
+
+    def _prefix(self, digest: str, settings: Dict[str, Any]) -> str:
+        fingerprint = hashlib.sha256(
+            json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+        return f"{digest}:{fingerprint}"
+
+    def get_pages(self, digest: str, settings: Dict[str, Any]) -> Optional[List[str]]:
+        """All page texts of a document, or None unless every page is cached"""
+        prefix = self._prefix(digest, settings)
+
+        count = self.get(f"{prefix}:pages")
+        if count is None:
+            return None
+
+        keys = [f"{prefix}:{i}" for i in range(int(count))]
+        found = self.get_many(keys)
+        if len(found) != len(keys):
+            return None
+
+        return [found[key] for key in keys]
+
+    def put_pages(self, digest: str, settings: Dict[str, Any], pages: List[str]):
+        prefix = self._prefix(digest, settings)
+        items = [(f"{prefix}:{i}", text) for i, text in enumerate(pages)]
+        items.append((f"{prefix}:pages", str(len(pages))))
+        self.set_many(items)
@@ -0,0 +1,96 @@
+"""
+Prompt Prefilter
+Reduces report text to the lines worth sending to an LLM
+"""
+
+import logging
+import math
+import re
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token for English lab text; no tokenizer is needed
+CHARS_PER_TOKEN = 4
+
+# Context lines longer than this are prose (disclaimers, notes), not wrapped values
+MAX_CONTEXT_CHARS = 120
+
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def build_alias_pattern(aliases: Iterable[str]) -> re.Pattern:
+    """One case-insensitive, word-bounded pattern for all aliases, longest first"""
+    ordered = sorted(set(a.lower() for a in aliases), key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(re.escape(a) for a in ordered) + r")\b", re.IGNORECASE)
+
+
+def prefilter_lines(text: str, alias_pattern: re.Pattern, context: int = 1) -> List[str]:
+    """
+    Lines that name an analyte and carry a number, plus `context` lines on
+    either side (values are sometimes wrapped onto the next line); long
+    prose lines are never kept as context. Headers, addresses, disclaimers
+    and method notes are dropped. Order is kept.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+
+    keep = set()
+    for i, line in enumerate(lines):
+        if alias_pattern.search(line) and NUMBER.search(line):
+            keep.add(i)
+            keep.update(
+                j for j in range(max(i - context, 0), min(i + context + 1, len(lines)))
+                if len(lines[j]) <= MAX_CONTEXT_CHARS
+            )
+
+    return [lines[i] for i in sorted(keep) if lines[i]]
+
+
+def chunk_lines(lines: List[str], max_tokens: int) -> List[str]:
+    """Group lines into texts of at most max_tokens each (a longer line stands alone)"""
+    chunks, current, size = [], [], 0
+
+    for line in lines:
+        tokens = estimate_tokens(line + "\n")
+        if current and size + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return chunks
+
+
+def compact_report(text: str, alias_pattern: re.Pattern, max_tokens: int,
+                   context: int = 1, metrics: Dict = None) -> List[str]:
+    """
+    Filtered report text split into prompt-sized chunks.
+
+    If a metrics dict is given it receives tokens_before, tokens_after,
+    lines_before, lines_after and chunks.
+    """
+    lines = prefilter_lines(text, alias_pattern, context)
+    chunks = chunk_lines(lines, max_tokens)
+
+    if metrics is not None:
+        metrics.update({
+            "tokens_before": estimate_tokens(text),
+            "tokens_after": sum(estimate_tokens(c) for c in chunks),
+            "lines_before": len(text.splitlines()),
+            "lines_after": len(lines),
+            "chunks": len(chunks),
+        })
+        logger.info(
+            f"Prefilter: {metrics['tokens_before']} -> {metrics['tokens_after']} tokens "
+            f"in {metrics['chunks']} chunk(s)"
+        )
+
+    return chunks
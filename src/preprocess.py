@@ -0,0 +1,171 @@
+"""
+Page Preprocessing
+Binarizes and deskews scanned pages and crops them to their result tables
+"""
+
+import logging
+from typing import Any, List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]  # x, y, width, height
+
+# Skew search range and step in degrees
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.5
+# Width the page is shrunk to for the skew search
+SKEW_SEARCH_WIDTH = 800
+# A ruling line must span at least this fraction of the page
+LINE_LENGTH_RATIO = 1 / 30
+# A table region must cover at least this fraction of the page
+MIN_REGION_AREA_RATIO = 0.02
+# Pixels of margin kept around each crop
+CROP_PADDING = 10
+
+
+def to_gray(image: Any) -> np.ndarray:
+    """PIL image or array -> 8-bit grayscale array"""
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert("L"))
+
+    array = np.asarray(image)
+    if array.ndim == 3:
+        return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+    return array
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Otsu threshold with ink as 255 on a 0 background"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return binary
+
+
+def rotate(array: np.ndarray, angle: float, border: int, interpolation: int = cv2.INTER_LINEAR) -> np.ndarray:
+    h, w = array.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(array, matrix, (w, h), flags=interpolation, borderValue=border)
+
+
+def estimate_skew(binary: np.ndarray) -> float:
+    """
+    Rotation (degrees) that levels the text lines.
+
+    Projection-profile search on a shrunken copy: when rows of text are
+    level, the per-row ink sums have the sharpest peaks, i.e. the largest
+    variance.
+    """
+    scale = min(1.0, SKEW_SEARCH_WIDTH / binary.shape[1])
+    small = cv2.resize(binary, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(round(MAX_SKEW_DEGREES / SKEW_STEP_DEGREES))
+
+    for i in range(-steps, steps + 1):
+        angle = i * SKEW_STEP_DEGREES
+        rotated = rotate(small, angle, 0, cv2.INTER_NEAREST)
+        score = float(np.var(rotated.sum(axis=1, dtype=np.float64)))
+        # prefer the smaller correction on ties
+        if score > best_score or (score == best_score and abs(angle) < abs(best_angle)):
+            best_angle, best_score = angle, score
+
+    return best_angle
+
+
+def deskew(gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Return the levelled grayscale page, its binarization and the angle used"""
+    binary = binarize(gray)
+    angle = estimate_skew(binary)
+
+    if angle:
+        gray = rotate(gray, angle, 255)
+        binary = binarize(gray)
+
+    return gray, binary, angle
+
+
+def _merge_overlapping(regions: List[Region]) -> List[Region]:
+    merged: List[Region] = []
+
+    for x, y, w, h in sorted(regions):
+        for i, (mx, my, mw, mh) in enumerate(merged):
+            if x < mx + mw and mx < x + w and y < my + mh and my < y + h:
+                left, top = min(x, mx), min(y, my)
+                right, bottom = max(x + w, mx + mw), max(y + h, my + mh)
+                merged[i] = (left, top, right - left, bottom - top)
+                break
+        else:
+            merged.append((x, y, w, h))
+
+    # merging can create new overlaps; repeat until stable
+    return merged if len(merged) == len(regions) else _merge_overlapping(merged)
+
+
+def find_table_regions(binary: np.ndarray) -> List[Region]:
+    """
+    Locate result tables from their ruling lines.
+
+    Long horizontal and vertical strokes are isolated with morphological
+    opening. Their combined grid gives fully ruled tables as contours;
+    reports that only rule rows (no column lines) contribute the band
+    between their first and last full-width rule.
+    """
+    h, w = binary.shape
+    page_area = h * w
+
+    horizontal = cv2.morphologyEx(
+        binary, cv2.MORPH_OPEN,
+        cv2.getStructuringElement(cv2.MORPH_RECT, (max(int(w * LINE_LENGTH_RATIO), 1), 1))
+    )
+    vertical = cv2.morphologyEx(
+        binary, cv2.MORPH_OPEN,
+        cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(int(h * LINE_LENGTH_RATIO), 1)))
+    )
+
+    grid = cv2.dilate(cv2.add(horizontal, vertical), np.ones((5, 5), np.uint8), iterations=2)
+    contours, _ = cv2.findContours(grid, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    regions = [cv2.boundingRect(c) for c in contours]
+    regions = [r for r in regions if r[2] * r[3] >= MIN_REGION_AREA_RATIO * page_area]
+
+    rules, _ = cv2.findContours(horizontal, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    rule_rows = [cv2.boundingRect(c) for c in rules]
+    rule_rows = [r for r in rule_rows if r[2] >= w / 2]
+
+    if len(rule_rows) >= 2:
+        top = min(r[1] for r in rule_rows)
+        bottom = max(r[1] + r[3] for r in rule_rows)
+        if w * (bottom - top) >= MIN_REGION_AREA_RATIO * page_area:
+            regions.append((0, top, w, bottom - top))
+
+    regions = _merge_overlapping(regions)
+
+    # reading order: top to bottom, then left to right
+    return sorted(regions, key=lambda r: (r[1], r[0]))
+
+
+def table_crops(image: Any) -> List[Image.Image]:
+    """
+    Deskewed crops of the result tables on a page, in reading order.
+
+    An empty list means no table was found and the caller should OCR the
+    whole page.
+    """
+    gray, binary, angle = deskew(to_gray(image))
+    regions = find_table_regions(binary)
+
+    if angle:
+        logger.debug(f"Deskewed page by {angle:.1f} degrees")
+
+    h, w = gray.shape
+    crops = []
+
+    for x, y, rw, rh in regions:
+        left, top = max(x - CROP_PADDING, 0), max(y - CROP_PADDING, 0)
+        right, bottom = min(x + rw + CROP_PADDING, w), min(y + rh + CROP_PADDING, h)
+        crops.append(Image.fromarray(gray[top:bottom, left:right]))
+
+    return crops
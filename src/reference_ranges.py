@@ -0,0 +1,176 @@
+"""
+Reference Range Registry
+Single source of reference ranges, compiled once per process and reloaded
+when the JSON file changes
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .classifier import ANY_SEX, RangeRule, RangeTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_ranges.json")
+
+SEX_CODES = {"male": "M", "m": "M", "female": "F", "f": "F", "any": ANY_SEX, "": ANY_SEX}
+
+
+class Compiled(NamedTuple):
+    table: RangeTable
+    units: Dict[str, str]
+    names: Dict[str, List[str]]
+    mtime: int
+
+
+def parse_rules(data: Dict[str, Any]) -> Tuple[List[RangeRule], Dict[str, str], Dict[str, List[str]]]:
+    """
+    Rules, units and display names from a registry file.
+
+    Accepts the registry layout ({"analytes": {id: {"unit", "names",
+    "ranges": [{"min", "max", "borderline_max", "sex", "age_min",
+    "age_max"}]}}}) and the older DataValidator layout ({"blood_parameters":
+    {id: {"reference_ranges": {"male": {"min", "max"}, ...}}}}).
+    """
+    rules, units, names = [], {}, {}
+
+    if "analytes" in data:
+        for analyte, spec in data["analytes"].items():
+            units[analyte] = spec.get("unit", "")
+            names[analyte] = list(spec.get("names", []))
+            for r in spec.get("ranges", []):
+                high = float(r["max"])
+                rules.append(RangeRule(
+                    analyte,
+                    float(r.get("min", -np.inf)),
+                    high,
+                    float(r.get("borderline_max", high)),
+                    SEX_CODES[str(r.get("sex", "any")).lower()],
+                    float(r.get("age_min", 0)),
+                    float(r.get("age_max", np.inf)),
+                    units[analyte],
+                ))
+
+    for analyte, spec in data.get("blood_parameters", {}).items():
+        units.setdefault(analyte, spec.get("unit", ""))
+        names.setdefault(analyte, [])
+        for sex, r in spec.get("reference_ranges", {}).items():
+            rules.append(RangeRule(
+                analyte, float(r["min"]), float(r["max"]), float(r["max"]),
+                SEX_CODES.get(sex.lower(), ANY_SEX), unit=units[analyte]
+            ))
+
+    return rules, units, names
+
+
+class ReferenceRegistry:
+    """
+    Reference ranges from one JSON file.
+
+    The file is parsed and compiled into a RangeTable on first use and again
+    only when its modification time changes; an edit that fails to parse
+    keeps the last good version in service.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._compiled: Optional[Compiled] = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Compiled:
+        mtime = os.stat(self.path).st_mtime_ns
+        compiled = self._compiled
+        if compiled is not None and compiled.mtime == mtime:
+            return compiled
+
+        with self._lock:
+            if self._compiled is not None and self._compiled.mtime == mtime:
+                return self._compiled
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    rules, units, names = parse_rules(json.load(f))
+
+                aliases = {n: analyte for analyte, spellings in names.items() for n in spellings}
+                self._compiled = Compiled(RangeTable(rules, aliases), units, names, mtime)
+                logger.info(f"Loaded {len(rules)} reference ranges from {self.path}")
+
+            except (OSError, ValueError, KeyError) as e:
+                if self._compiled is None:
+                    raise
+                logger.warning(f"Keeping previous reference ranges; could not reload {self.path}: {e}")
+
+            return self._compiled
+
+    @property
+    def table(self) -> RangeTable:
+        return self._current().table
+
+    @property
+    def version(self) -> int:
+        """Changes whenever a reload puts new ranges in service (the file's mtime)"""
+        return self._current().mtime
+
+    def unit(self, analyte: str) -> str:
+        compiled = self._current()
+        ids = compiled.table.analyte_ids([analyte])
+        return compiled.units.get(compiled.table.analytes[ids[0]], "") if ids[0] >= 0 else ""
+
+    def standards(self, names: Iterable[str], sex: str = None, age: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        {name: {"min", "max", "unit", "analyte"}} in the shape the apps use,
+        for the given names (any spelling) and person. "max" is the top of
+        the normal band; "borderline_max" is added where a borderline band
+        exists; "analyte" is the registry id. Names without a range are left
+        out.
+        """
+        standards = {}
+        for name in names:
+            rule = self.table.lookup(name, sex, age)
+            if rule is None:
+                continue
+            entry = {
+                "min": rule.low if np.isfinite(rule.low) else 0,
+                "max": rule.normal_max,
+                "unit": self.unit(name),
+                "analyte": rule.analyte,
+            }
+            if rule.borderline_max > rule.normal_max:
+                entry["borderline_max"] = rule.borderline_max
+            standards[name] = entry
+        return standards
+
+    def min_max(self, analytes: Iterable[str] = None) -> Dict[str, Tuple[float, float]]:
+        """{analyte: (min, max)} general ranges, as in ranges.REFERENCE_RANGES"""
+        analytes = self.table.analytes if analytes is None else analytes
+        return {a: (s["min"], s["max"]) for a, s in self.standards(analytes).items()}
+
+    def as_blood_parameters(self) -> Dict[str, Any]:
+        """Ranges in DataValidator's {"blood_parameters": ...} layout"""
+        table = self.table
+        params = {}
+        for analyte in table.analytes:
+            ranges = {}
+            for label, sex in (("any", None), ("male", "M"), ("female", "F")):
+                rule = table.lookup(analyte, sex)
+                if rule is not None:
+                    ranges[label] = {"min": rule.low if np.isfinite(rule.low) else 0, "max": rule.normal_max}
+            params[analyte] = {"unit": self.unit(analyte), "reference_ranges": ranges}
+        return {"blood_parameters": params}
+
+
+_registries: Dict[str, ReferenceRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(path: str = None) -> ReferenceRegistry:
+    """Registry for a file (default: src/reference_ranges.json), one per process"""
+    path = os.path.abspath(path or DEFAULT_PATH)
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = ReferenceRegistry(path)
+        return _registries[path]
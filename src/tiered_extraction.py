@@ -0,0 +1,237 @@
+"""
+Tiered Extraction
+Resolves analytes with a local alias pass first and asks an LLM only for the rest
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .data_extraction import ParameterExtractor
+from .prefilter import build_alias_pattern
+from .units import UnitConverter, canonical_unit
+
+logger = logging.getLogger(__name__)
+
+LOCAL, LLM, UNRESOLVED = "local", "llm", "unresolved"
+
+# A local value is trusted at or above this confidence
+MIN_CONFIDENCE = 0.8
+# Confidence factors for the ways a local match can be doubtful
+CONFLICT_FACTOR = 0.5      # the report gives different values for the analyte
+CONFLICT_TOLERANCE = 0.01  # relative difference below which two values agree
+IMPLAUSIBLE_FACTOR = 0.3   # the value is far outside anything the reference range suggests
+UNIT_FACTOR = 0.7          # a unit is printed and it cannot be converted to the expected one
+# A value is plausible within [min / PLAUSIBLE_SPAN, max * PLAUSIBLE_SPAN]
+PLAUSIBLE_SPAN = 10
+# Locally resolved analytes needed to call a text a blood report without
+# asking the LLM; with fewer, the LLM verifies the report
+MIN_REPORT_ANALYTES = 3
+
+# Words that, directly before an alias, name a different analyte
+# ("HDL Cholesterol", "Mean Corpuscular Hemoglobin", "Urine Glucose")
+QUALIFIERS = frozenset({
+    "hdl", "ldl", "vldl", "non-hdl", "mean", "corpuscular", "glycated", "glycosylated",
+    "urine", "urinary", "nucleated",
+})
+
+# name, optional separator or "(abbreviation)", value, optional unit
+VALUE_AFTER_NAME = re.compile(r"[\s:=\-]*(?:\(.*?\)\s*)?(\d+(?:\.\d+)?)\s*([A-Za-z%/µμ][^\s]*)?")
+
+
+def standard_value(value: float, unit: Optional[str],
+                   ref: Optional[Dict[str, Any]]) -> Tuple[float, str, bool]:
+    """
+    (value, unit, ok): value in the reference range's unit where the printed
+    unit converts to it. A missing unit is taken to be the reference one,
+    except for raw counts (UnitConverter.bare_unit); ok is False when the
+    printed unit has no conversion, and the value and unit are then
+    returned as printed.
+    """
+    if not ref:
+        return value, unit or "", True
+
+    analyte = ref.get("analyte")
+    if not unit and analyte:
+        unit = UnitConverter.bare_unit(analyte, value)
+    if not unit or canonical_unit(unit) == canonical_unit(ref["unit"]):
+        return value, ref["unit"], True
+
+    if analyte and UnitConverter.factor(analyte, unit) and UnitConverter.factor(analyte, ref["unit"]):
+        # two decimals: 5.5 mmol/L reads as 99.1 mg/dL, not 99.1001
+        return round(UnitConverter.convert(value, analyte, unit, ref["unit"])[0], 2), ref["unit"], True
+    return value, unit, False
+
+
+class LocalExtractor:
+    """
+    Alias-and-number pass with a confidence score per analyte.
+
+    aliases maps each standard test name to the spellings a report may use;
+    names are resolved through a ParameterExtractor built on that table.
+    An alias directly preceded by one of QUALIFIERS belongs to another
+    analyte and is ignored. standards maps test names to {"min", "max",
+    "unit", "analyte"} reference ranges, as ReferenceRegistry.standards
+    gives them; values are converted to that unit, which drives the
+    plausibility and unit checks. It may also be a function returning that
+    map, called per extraction so reloaded ranges are used.
+    """
+
+    def __init__(self, aliases: Dict[str, List[str]],
+                 standards: Union[Dict[str, Dict[str, Any]], Callable[[], Dict[str, Dict[str, Any]]]]):
+        self._standards = standards if callable(standards) else lambda: standards
+        self.names = ParameterExtractor(aliases)
+        self.pattern = build_alias_pattern(self.names.reverse_aliases)
+
+    @property
+    def standards(self) -> Dict[str, Dict[str, Any]]:
+        return self._standards()
+
+    def _confidence(self, values: List[float], unit_ok: bool, ref: Optional[Dict[str, Any]]) -> float:
+        confidence = 1.0
+        value = values[0]
+
+        # values are in the reference unit, so 5.5 mmol/L and 99 mg/dL agree
+        # (within CONFLICT_TOLERANCE, for the rounding of printed values)
+        if max(values) - min(values) > CONFLICT_TOLERANCE * max(abs(v) for v in values):
+            confidence *= CONFLICT_FACTOR
+
+        if ref:
+            low = ref["min"] / PLAUSIBLE_SPAN
+            high = ref["max"] * PLAUSIBLE_SPAN
+            if not low <= value <= high:
+                confidence *= IMPLAUSIBLE_FACTOR
+
+            if not unit_ok:
+                confidence *= UNIT_FACTOR
+
+        return confidence
+
+    def _matches(self, line: str):
+        """(test, match) for each alias on line that is not qualified into another analyte"""
+        for match in self.pattern.finditer(line):
+            before = line[:match.start()].split()
+            if before and before[-1].strip("():,;").lower() in QUALIFIERS:
+                continue
+            yield self.names.normalize_parameter_name(match.group(0)), match
+
+    def mentioned(self, text: str) -> set:
+        """Tests whose name appears anywhere in text, with or without a value"""
+        return {test for line in text.splitlines() for test, _ in self._matches(line)}
+
+    def extract(self, text: str) -> Dict[str, Dict[str, Any]]:
+        """Best local candidate per test: {"value", "unit", "confidence"}, in the reference unit where it converts"""
+        found: Dict[str, List] = {}
+
+        for line in text.splitlines():
+            for test, match in self._matches(line):
+                value = VALUE_AFTER_NAME.match(line, match.end())
+                if value:
+                    found.setdefault(test, []).append((float(value.group(1)), value.group(2)))
+
+        standards = self.standards
+        results = {}
+        for test, hits in found.items():
+            ref = standards.get(test)
+            converted = [standard_value(value, unit, ref) for value, unit in hits]
+            value, unit, unit_ok = converted[0]
+            results[test] = {
+                "value": value,
+                "unit": unit,
+                "confidence": self._confidence([v for v, _, _ in converted], unit_ok, ref),
+            }
+
+        return results
+
+
+class TierStats:
+    """Thread-safe running count of which tier resolved each analyte"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.resolved = Counter()
+        self.reports = 0
+        self.llm_reports = 0
+
+    def record(self, tiers: Dict[str, str], llm_called: bool):
+        with self._lock:
+            self.resolved.update(tiers.values())
+            self.reports += 1
+            self.llm_reports += int(llm_called)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.resolved.values()) or 1
+            return {
+                "reports": self.reports,
+                "reports_needing_llm": self.llm_reports,
+                **{f"{tier}_share": self.resolved[tier] / total for tier in (LOCAL, LLM, UNRESOLVED)},
+            }
+
+
+TIER_STATS = TierStats()
+
+
+def tiered_extract(text: str, local: LocalExtractor,
+                   llm_fallback: Callable[[List[str]], Dict[str, Any]],
+                   tests: List[str], metrics: Dict = None,
+                   stats: TierStats = TIER_STATS) -> Dict[str, Any]:
+    """
+    Resolve `tests` from text, cheapest tier first.
+
+    Values the local pass finds with enough confidence are final. Tests the
+    report names but the local pass could not settle (no value on the line,
+    or a doubtful one) are passed to llm_fallback, which returns the usual
+    {"is_blood_report", "results"} answer for just those tests; tests the
+    report never names cost nothing. Each result item gets a "Tier" key; the
+    tier per mentioned test is stored in metrics["tiers"] and added to stats.
+    Values from both tiers are in the reference unit where theirs converts.
+
+    The text counts as a blood report when the LLM says so, or when at least
+    MIN_REPORT_ANALYTES tests were resolved locally. With fewer local values
+    and nothing pending, the LLM is still asked about the resolved tests to
+    verify the report; its values for them are not used.
+    """
+    candidates = local.extract(text)
+    mentioned = local.mentioned(text)
+
+    results = []
+    tiers = {}
+
+    for test in tests:
+        candidate = candidates.get(test)
+        if candidate and candidate["confidence"] >= MIN_CONFIDENCE:
+            results.append({"Test": test, "Value": candidate["value"], "Unit": candidate["unit"], "Tier": LOCAL})
+            tiers[test] = LOCAL
+
+    pending = [t for t in tests if t not in tiers and t in mentioned]
+    is_blood_report = len(results) >= MIN_REPORT_ANALYTES
+    verify = bool(results) and not pending and not is_blood_report
+
+    if pending or verify:
+        answer = llm_fallback(pending or list(tiers))
+        is_blood_report |= bool(answer.get("is_blood_report"))
+        standards = local.standards
+
+        for item in answer.get("results", []):
+            test = item.get("Test")
+            if test in pending and test not in tiers:
+                try:
+                    value, unit, _ = standard_value(float(item.get("Value")), item.get("Unit"), standards.get(test))
+                    item = {**item, "Value": value, "Unit": unit}
+                except (TypeError, ValueError):
+                    pass  # not a number; left for the caller to show as it came
+                results.append({**item, "Tier": LLM})
+                tiers[test] = LLM
+
+    for test in pending:
+        tiers.setdefault(test, UNRESOLVED)
+
+    stats.record(tiers, llm_called=bool(pending or verify))
+
+    if metrics is not None:
+        metrics["tiers"] = tiers
+
+    return {"is_blood_report": is_blood_report, "results": results}
@@ -0,0 +1,125 @@
+"""
+Document Token Index
+One-pass index of analyte mentions and numeric values in report text
+"""
+
+import logging
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Words (which may carry digits, as in "HbA1c" or "T3") and plain numbers;
+# a number glued to a word, a decimal point or an exponent ("x10", "10^3")
+# is not a value
+WORD = re.compile(r"[^\W\d_]\w*")
+NUMBER = re.compile(r"(?<![\w.^])\d+(?:\.\d+)?(?![\d^]|\.\d)")
+NEWLINE = re.compile(r"\n")
+
+# Lines below a mention that may still hold its value (table cells are often
+# extracted one per line)
+MAX_VALUE_LINES = 2
+
+
+class Token(NamedTuple):
+    text: str
+    start: int
+    end: int
+    line: int      # 0-based
+    column: int    # 0-based, from the start of the line
+
+
+class Mention(NamedTuple):
+    test: str
+    alias: str
+    token: Token   # spans the whole alias, possibly several words
+
+
+class DocumentIndex:
+    """
+    Alias and number positions of one document, built in one pass over its
+    words and numbers.
+
+    aliases maps each test name to the spellings a report may use. Aliases
+    are matched as whole word sequences (longest first), so "Hb" does not
+    match inside "HbA1c". Looking up a test's value is a bisect over the
+    number positions, so the total cost is linear in the document size
+    whatever the number of aliases.
+
+    Numbers that belong to a word, unit or exponent ("T3", "x10", "10^3")
+    are not values.
+    """
+
+    def __init__(self, text: str, aliases: Dict[str, Iterable[str]]):
+        self.text = text
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # a few characters change length when lowered; keep offsets exact
+            lowered = "".join(c.lower()[:1] for c in text)
+
+        self._line_starts = [0] + [m.end() for m in NEWLINE.finditer(text)]
+        self._number_spans = [m.span() for m in NUMBER.finditer(text)]
+        self._number_starts = [start for start, _ in self._number_spans]
+
+        # phrases grouped by first word, longest first; a phrase's words may be
+        # separated by any run of blanks, but not by a line break
+        by_first_word = {}
+        for test, names in aliases.items():
+            for alias in names:
+                words = alias.lower().split()
+                if words:
+                    rest = re.compile(r"".join(r"[ \t]+" + re.escape(w) for w in words[1:]) + r"(?!\w)")
+                    by_first_word.setdefault(words[0], []).append((len(words), rest, test, alias))
+        for phrases in by_first_word.values():
+            phrases.sort(key=lambda p: -p[0])
+
+        self.mentions: Dict[str, List[Mention]] = {test: [] for test in aliases}
+        position = 0
+        for match in WORD.finditer(lowered):
+            phrases = by_first_word.get(match.group())
+            if phrases is None or match.start() < position:
+                continue
+            for _, rest, test, alias in phrases:
+                tail = rest.match(lowered, match.end())
+                if tail:
+                    position = tail.end()
+                    self.mentions[test].append(Mention(test, alias, self._token(match.start(), position)))
+                    break
+
+    def _token(self, start: int, end: int) -> Token:
+        line = bisect_right(self._line_starts, start) - 1
+        return Token(self.text[start:end], start, end, line, start - self._line_starts[line])
+
+    @property
+    def numbers(self) -> List[Token]:
+        return [self._token(start, end) for start, end in self._number_spans]
+
+    def value_after(self, position: int, line: int, max_lines: int = MAX_VALUE_LINES) -> Optional[Token]:
+        """First number starting at or after position, at most max_lines below line"""
+        i = bisect_right(self._number_starts, position - 1)
+        if i == len(self._number_spans):
+            return None
+        token = self._token(*self._number_spans[i])
+        return token if token.line - line <= max_lines else None
+
+    def value_token(self, test: str, max_lines: int = MAX_VALUE_LINES) -> Optional[Token]:
+        """Value of the first mention of test that has one nearby"""
+        for mention in self.mentions.get(test, ()):
+            token = self.value_after(mention.token.end, mention.token.line, max_lines)
+            if token is not None:
+                return token
+        return None
+
+    def value(self, test: str, max_lines: int = MAX_VALUE_LINES) -> Optional[float]:
+        token = self.value_token(test, max_lines)
+        return float(token.text) if token is not None else None
+
+    def values(self, max_lines: int = MAX_VALUE_LINES) -> Dict[str, float]:
+        """{test: value} for every test with a resolvable mention"""
+        found = {}
+        for test in self.mentions:
+            value = self.value(test, max_lines)
+            if value is not None:
+                found[test] = value
+        return found
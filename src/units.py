@@ -0,0 +1,246 @@
+"""
+Unit Conversion Module
+Canonical unit spellings and conversion to each parameter's standard unit.
+Kept free of numpy and pandas so the text extractors can import it cheaply;
+only the vectorised convert_many loads them.
+"""
+
+import logging
+import re
+import sys
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Unit spellings seen in reports, after canonical_unit's character folding
+UNIT_ALIASES = {
+    "": "",
+    "-": "",
+    "nan": "",
+    "none": "",
+    "unit_not_specified": "",
+    "g/100ml": "g/dl",
+    "gm/dl": "g/dl",
+    "gms/dl": "g/dl",
+    "mg/100ml": "mg/dl",
+    "mg%": "mg/dl",
+    "iu/l": "u/l",
+    "mmol/mol": "mmol/mol",
+    "cells/ul": "/ul",
+    "cell/ul": "/ul",
+    "k/ul": "10^3/ul",
+    "thou/ul": "10^3/ul",
+    "thousand/ul": "10^3/ul",
+    "lakhs/ul": "lakh/ul",
+    "lacs/ul": "lakh/ul",
+    "million/ul": "10^6/ul",
+    "millions/ul": "10^6/ul",
+    "mill/ul": "10^6/ul",
+    "m/ul": "10^6/ul",
+    "uu/ml": "uiu/ml",
+}
+
+_UNIT_FOLDS = [
+    (re.compile(r"\s+"), ""),
+    (re.compile(r"[µμ]"), "u"),
+    (re.compile(r"[×*]"), "x"),
+    (re.compile(r"³"), "^3"),
+    (re.compile(r"⁶"), "^6"),
+    (re.compile(r"⁹"), "^9"),
+    (re.compile(r"¹²"), "^12"),
+    (re.compile(r"10(?:x|e)(\d+)"), r"10^\1"),
+    (re.compile(r"^x(?=10\^)"), ""),
+    (re.compile(r"/(?:cu\.?mm|mm\^?3|mcl)$"), "/ul"),
+]
+
+
+@lru_cache(maxsize=4096)
+def canonical_unit(unit: Any) -> str:
+    """
+    Lookup key for a unit string ("x10³/µL", "10^3/ul" and "K/uL" all give
+    "10^3/ul"). Missing units give "". Keys are interned and memoized, so a
+    column of repeated spellings is folded once per distinct spelling.
+    """
+    if unit is None or (isinstance(unit, float) and unit != unit):
+        return ""
+    key = str(unit).strip().lower()
+    for pattern, replacement in _UNIT_FOLDS:
+        key = pattern.sub(replacement, key)
+    return sys.intern(UNIT_ALIASES.get(key, key))
+
+
+class Conversion(NamedTuple):
+    values: "np.ndarray"   # float64, in the standard unit where ok
+    units: "np.ndarray"    # standard unit where ok, the original unit elsewhere
+    ok: "np.ndarray"       # False where the unit (or parameter) has no conversion
+
+
+class UnitConverter:
+    """Converts between different measurement units"""
+    
+    # Unit every parameter is reported and compared in
+    STANDARD_UNITS = {
+        "hemoglobin": "g/dL",
+        "rbc_count": "million/uL",
+        "wbc_count": "x10^3/uL",
+        "platelet_count": "x10^3/uL",
+        "glucose": "mg/dL",
+        "fasting_plasma_glucose": "mg/dL",
+        "post_prandial_plasma_glucose": "mg/dL",
+        "hba1c": "%",
+        "total_cholesterol": "mg/dL",
+        "hdl_cholesterol": "mg/dL",
+        "ldl_cholesterol": "mg/dL",
+        "triglycerides": "mg/dL",
+        "tsh": "uIU/mL",
+        "t3": "ng/dL",
+        "t4": "ug/dL",
+        "bilirubin_total": "mg/dL",
+        "sgot": "U/L",
+        "sgpt": "U/L",
+        "alp": "U/L",
+        "urea": "mg/dL",
+        "bun": "mg/dL",
+        "creatinine": "mg/dL",
+        "albumin": "g/dL",
+        "sodium": "mmol/L",
+        "potassium": "mmol/L",
+    }
+    
+    # Conversion factors to standard units, keyed by canonical_unit();
+    # a (factor, offset) pair is an affine conversion. The standard unit
+    # itself always converts with factor 1.
+    CONVERSIONS = {
+        "hemoglobin": {"g/l": 0.1, "mmol/l": 1.611},
+        "rbc_count": {"10^12/l": 1.0, "/ul": 1e-6},
+        "wbc_count": {"10^9/l": 1.0, "/ul": 1e-3},
+        "platelet_count": {"10^9/l": 1.0, "/ul": 1e-3, "lakh/ul": 100.0},
+        "glucose": {"mmol/l": 18.0182},
+        "fasting_plasma_glucose": {"mmol/l": 18.0182},
+        "post_prandial_plasma_glucose": {"mmol/l": 18.0182},
+        "hba1c": {"mmol/mol": (0.09148, 2.152)},  # NGSP % from IFCC
+        "total_cholesterol": {"mmol/l": 38.67},
+        "hdl_cholesterol": {"mmol/l": 38.67},
+        "ldl_cholesterol": {"mmol/l": 38.67},
+        "triglycerides": {"mmol/l": 88.57},
+        "tsh": {"miu/l": 1.0},
+        "t3": {"nmol/l": 65.1, "ng/ml": 100.0},
+        "t4": {"nmol/l": 0.0777},
+        "bilirubin_total": {"umol/l": 0.05848},
+        "sgot": {"ukat/l": 60.0},
+        "sgpt": {"ukat/l": 60.0},
+        "alp": {"ukat/l": 60.0},
+        "urea": {"mmol/l": 6.006},
+        "bun": {"mmol/l": 2.801},
+        "creatinine": {"umol/l": 0.01131},
+        "albumin": {"g/l": 0.1},
+        "sodium": {"meq/l": 1.0},
+        "potassium": {"meq/l": 1.0},
+    }
+    
+    # Counts printed without a unit are in the standard x10^3/uL unless
+    # above these values, which only a raw cells/uL count reaches
+    # ("WBC 7500", "Platelets 250000")
+    BARE_COUNT_LIMITS = {
+        "wbc_count": 1000,
+        "platelet_count": 2000,
+    }
+    
+    canonical_unit = staticmethod(canonical_unit)
+    
+    @classmethod
+    def bare_unit(cls, parameter: str, value: float) -> str:
+        """Unit of a value printed without one: "/uL" for a raw count, else "" (the standard unit)"""
+        limit = cls.BARE_COUNT_LIMITS.get(str(parameter).strip().lower())
+        return "/uL" if limit is not None and value > limit else ""
+    
+    @classmethod
+    def factor(cls, parameter: str, unit: Any) -> Optional[Tuple[float, float]]:
+        """(factor, offset) taking unit to the standard unit; None if not convertible"""
+        return _conversion_factor(cls, str(parameter).strip().lower(), canonical_unit(unit))
+    
+    @classmethod
+    def convert(cls, value: float, parameter: str, from_unit: str, to_unit: str = None) -> Tuple[float, str]:
+        """
+        value in the standard unit (or to_unit). Values whose unit cannot be
+        converted are returned unchanged with their own unit; a missing unit
+        is read as bare_unit gives it.
+        """
+        if not from_unit:
+            from_unit = cls.bare_unit(parameter, value)
+        source = cls.factor(parameter, from_unit)
+        target = cls.factor(parameter, to_unit) if to_unit is not None else (1.0, 0.0)
+        if source is None or target is None:
+            logger.debug(f"No conversion for {parameter} from {from_unit!r} to {to_unit!r}")
+            return value, from_unit
+        
+        standard = value * source[0] + source[1]
+        if to_unit is None:
+            return standard, cls.STANDARD_UNITS[str(parameter).strip().lower()]
+        return (standard - target[1]) / target[0], to_unit
+    
+    @classmethod
+    def convert_many(cls, parameters, values, units) -> Conversion:
+        """
+        Convert whole columns to standard units at once.
+        
+        parameters, values and units are parallel arrays (units may also be
+        a single string). Factors are looked up once per distinct
+        (parameter, unit) pair and applied with one gather; ok flags rows
+        whose unit or parameter has no conversion, which keep their value.
+        Missing units are read as bare_unit gives them.
+        """
+        import numpy as np
+        import pandas as pd
+
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if isinstance(units, str) or units is None:
+            units = np.full(n, units, dtype=object)
+        
+        param_codes, param_uniques = pd.factorize(np.asarray(parameters, dtype=object))
+        unit_codes, unit_uniques = pd.factorize(np.asarray(units, dtype=object))
+        
+        # raw counts printed without a unit are in cells/uL
+        missing = np.array([canonical_unit(u) == "" for u in unit_uniques] + [True])[unit_codes]
+        limits = np.array([cls.BARE_COUNT_LIMITS.get(str(p).strip().lower(), np.inf) for p in param_uniques]
+                          + [np.inf])[param_codes]
+        raw = missing & (values > limits)
+        if raw.any():
+            units = np.where(raw, "/uL", np.asarray(units, dtype=object))
+            unit_codes, unit_uniques = pd.factorize(units)
+        
+        # one extra row / column for the -1 code factorize gives missing entries
+        factors = np.full((len(param_uniques) + 1, len(unit_uniques) + 1), np.nan)
+        offsets = np.zeros_like(factors)
+        standard_units = np.empty(len(param_uniques) + 1, dtype=object)
+        
+        unit_keys = [canonical_unit(u) for u in unit_uniques] + [""]
+        for i, parameter in enumerate(param_uniques):
+            name = str(parameter).strip().lower()
+            standard_units[i] = cls.STANDARD_UNITS.get(name)
+            for j, key in enumerate(unit_keys):
+                pair = _conversion_factor(cls, name, key)
+                if pair is not None:
+                    factors[i, j], offsets[i, j] = pair
+        
+        factor = factors[param_codes, unit_codes]
+        ok = ~np.isnan(factor)
+        converted = np.where(ok, values * factor + offsets[param_codes, unit_codes], values)
+        out_units = np.where(ok, standard_units[param_codes], np.asarray(units, dtype=object))
+        return Conversion(converted, out_units, ok)
+
+
+@lru_cache(maxsize=4096)
+def _conversion_factor(converter: type, parameter: str, unit_key: str) -> Optional[Tuple[float, float]]:
+    if parameter not in converter.STANDARD_UNITS:
+        return None
+    # a missing unit is taken to be the standard one, as the extractors report
+    if unit_key in ("", canonical_unit(converter.STANDARD_UNITS[parameter])):
+        return 1.0, 0.0
+    entry = converter.CONVERSIONS.get(parameter, {}).get(unit_key)
+    if entry is None:
+        return None
+    return tuple(map(float, entry)) if isinstance(entry, tuple) else (float(entry), 0.0)